@@ -0,0 +1,330 @@
+import argparse
+import sys
+import time
+
+import cpu_profile
+
+# Headless entry point: python -m agrinova <command> ...
+PROGRESS_INTERVAL = 5.0  # Seconds between progress lines
+
+
+def class_ratio(value):
+    # argparse type for --class-ratio: "lantana=2" -> ("lantana", 2.0)
+    name, separator, weight = value.rpartition('=')
+    try:
+        weight = float(weight)
+    except ValueError:
+        weight = None
+    if not separator or not name or weight is None or not weight > 0:
+        raise argparse.ArgumentTypeError(f"expected CLASS=WEIGHT with a positive weight, got {value!r}")
+    return name, weight
+
+
+def parse_ratios(values):
+    # [("healthy", 1.0), ("lantana", 2.0)] -> {"healthy": 1.0, "lantana": 2.0}
+    return dict(values) if values else None
+
+
+def check_class_ratios(parser, args):
+    # A misspelled class would otherwise silently keep its default weight
+    from datasets import list_image_files
+
+    _, _, class_labels = list_image_files(args.folder)
+    unknown = sorted(set(parse_ratios(args.class_ratio)) - set(class_labels))
+    if unknown:
+        parser.error(f"--class-ratio: unknown class {', '.join(map(repr, unknown))}; "
+                     f"classes in {args.folder} are {', '.join(map(repr, class_labels))}")
+
+
+def cmd_train(args):
+    import training
+
+    last_print = [0.0]
+    last_progress = {}
+
+    def on_progress(progress):
+        last_progress.update(progress)
+        now = time.perf_counter()
+        if now - last_print[0] >= PROGRESS_INTERVAL or progress['batch'] == progress['steps']:
+            last_print[0] = now
+            print(training.format_progress(progress), flush=True)
+
+    start = time.perf_counter()
+    result = training.train_model(args.folder, on_progress=on_progress, use_cache=not args.no_cache,
+                                  epochs=args.epochs or training.EPOCHS, batch_size=args.batch_size or training.BATCH_SIZE,
+                                  out_dir=args.out, remove_duplicates=not args.keep_duplicates,
+                                  balance=args.balance or bool(args.class_ratio), class_ratios=parse_ratios(args.class_ratio),
+                                  steps_per_epoch=args.steps_per_epoch)
+    elapsed = time.perf_counter() - start
+    if result['num_images'] == 0:
+        print(f"No images found in {args.folder}")
+        return 1
+
+    print(f"Trained on {result['num_images']} images in {elapsed:.1f}s")
+    if last_progress:
+        print(f"Training throughput: {last_progress['images_per_sec']:.1f} images/s over "
+              f"{last_progress['batches_done']} batches")
+    print(f"Wrote {training.MODEL_PATH} and {training.LABELS_PATH} to {args.out}")
+    return 0
+
+
+def cmd_dedupe(args):
+    import dedupe
+    from datasets import list_image_files
+
+    paths, labels, _ = list_image_files(args.folder)
+    kept, _, report = dedupe.dedupe(paths, labels, args.max_distance)
+    for entry in report:
+        note = ' (different class!)' if entry['cross_class'] else ''
+        print(f"{entry['kind']:>5} d={entry['distance']}: {entry['path']} -> {entry['duplicate_of']}{note}")
+    print(f"{len(kept)} of {len(paths)} images would be used for training")
+    return 0
+
+
+def cmd_scan(args):
+    import preflight
+    from datasets import list_image_files
+
+    paths, labels, _ = list_image_files(args.folder)
+    good, _, rejected = preflight.preflight(args.folder, paths, labels, move_bad=not args.no_quarantine)
+    print(f"{len(good)} of {len(paths)} images decode cleanly")
+    return 1 if rejected else 0
+
+
+def cmd_sweep(args):
+    import sweep
+
+    results = sweep.run_sweep(args.folder, sweep.load_configs(args.configs), args.workers, args.min_accuracy)
+    return 0 if results else 1
+
+
+def cmd_classify(args):
+    import batch_classify
+    import inference
+    import training
+
+    model, class_labels = training.load_trained_model(args.model_dir)
+    predictor = inference.load_predictor(model, args.backend, args.model_dir)
+    start = time.perf_counter()
+
+    def on_progress(done, total):
+        elapsed = time.perf_counter() - start
+        print(f"{done}/{total} images, {done / elapsed:.1f} images/s", flush=True)
+
+    done = batch_classify.classify_folder(args.folder, args.out, predictor, class_labels, args.batch_size, on_progress)
+    print(f"Classified {done} images into {args.out}")
+    return 0
+
+
+def cmd_export_tflite(args):
+    import os
+    import inference
+    import tflite_export
+    import training
+
+    model, _ = training.load_trained_model(args.model_dir)
+    paths = tflite_export.export_tflite(model, args.folder, args.model_dir)
+    for path in paths:
+        print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    if args.compare:
+        predictors = [('keras', inference.Predictor(model), os.path.getsize(os.path.join(args.model_dir, training.MODEL_PATH)))]
+        predictors += [(name, inference.load_predictor(model, name, args.model_dir), os.path.getsize(path))
+                       for name, path in zip(inference.TFLITE_BACKENDS, paths)]
+        print(f"{'backend':<12} {'accuracy':>9} {'agrees':>8} {'latency ms':>11} {'size MB':>8}")
+        for row in tflite_export.compare_backends(predictors, args.folder):
+            print(f"{row['backend']:<12} {row['accuracy'] * 100:>8.1f}% {row['agreement'] * 100:>7.1f}% "
+                  f"{row['latency_ms']:>11.2f} {row['size_mb']:>8.1f}")
+    return 0
+
+
+def cmd_bench_predict(args):
+    import inference
+    import training
+
+    model, _ = training.load_trained_model(args.model_dir)
+    results = inference.benchmark_latency(model, args.runs)
+    print(f"model.predict: first call {results['predict_first_ms']:.1f} ms, then {results['predict_ms']:.2f} ms (median)")
+    print(f"Predictor:     warm-up {results['predictor_warmup_ms']:.1f} ms at load, first call "
+          f"{results['predictor_first_ms']:.2f} ms, then {results['predictor_ms']:.2f} ms (median)")
+    return 0
+
+
+def cmd_serve(args):
+    import inference
+    import inference_server
+    import training
+
+    model, class_labels = training.load_trained_model(args.model_dir)
+    predictor = inference.load_predictor(model, args.backend, args.model_dir)
+    server = inference_server.InferenceServer((args.host, args.port), predictor, class_labels, args.backend,
+                                              args.max_batch_size, args.max_latency_ms)
+    print(f"Serving {args.backend} model on http://{args.host}:{args.port} (POST /predict, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    stats = server.batcher.stats
+    if stats['batches']:
+        print(f"Answered {stats['requests']} requests in {stats['batches']} batches "
+              f"({stats['requests'] / stats['batches']:.1f} per batch)")
+    return 0
+
+
+def cmd_watch(args):
+    import inference
+    import training
+    import watch_folder
+
+    model, class_labels = training.load_trained_model(args.model_dir)
+    predictor = inference.load_predictor(model, args.backend, args.model_dir)
+
+    def on_results(results):
+        for result in results:
+            if result['label'] is None:
+                print(f"{result['path']}: unreadable ({result['error']})", flush=True)
+                continue
+            alert = '  <-- INVASIVE SPECIES' if result['label'] == "Invasive Species" else ''
+            print(f"{result['path']}: {result['label']} ({result['confidence'] * 100:.1f}%){alert}", flush=True)
+
+    print(f"Watching {args.folder}, logging to {args.log} (Ctrl+C to stop)")
+    try:
+        done = watch_folder.watch_folder(args.folder, predictor, class_labels, args.log, on_results,
+                                         debounce=args.debounce, batch_size=args.batch_size, polling=args.poll)
+    except KeyboardInterrupt:
+        return 0
+    print(f"Classified {done} images")
+    return 0
+
+
+def cmd_video(args):
+    import inference
+    import training
+    import video_classify
+
+    model, class_labels = training.load_trained_model(args.model_dir)
+    predictor = inference.load_predictor(model, args.backend, args.model_dir)
+    start = time.perf_counter()
+
+    def on_progress(seconds, duration):
+        elapsed = time.perf_counter() - start
+        print(f"{video_classify.format_time(seconds)} / {video_classify.format_time(duration)}, "
+              f"{seconds / elapsed:.1f}x real time", flush=True)
+
+    timeline = video_classify.classify_video(args.video, predictor, class_labels, args.rate, args.scene_threshold,
+                                             args.batch_size, on_progress)
+    for segment in timeline:
+        print(f"{video_classify.format_time(segment['start'])} - {video_classify.format_time(segment['end'])}  "
+              f"{segment['label']} ({segment['confidence'] * 100:.1f}%, {segment['frames']} frames)")
+    if args.out:
+        video_classify.save_timeline(timeline, args.out)
+        print(f"Wrote {args.out}")
+    return 0
+
+
+def cmd_autotune(args):
+    return 0 if cpu_profile.autotune() else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='agrinova', description="AGRINOVA command-line tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train = subparsers.add_parser('train', help="train a model from a folder with one sub-folder per class")
+    train.add_argument('folder')
+    train.add_argument('--epochs', type=int, default=None, help="maximum epochs (early stopping may end sooner)")
+    train.add_argument('--batch-size', type=int, default=None)
+    train.add_argument('--out', default='.', help="directory for trained_model.h5 and class_labels.pkl")
+    train.add_argument('--no-cache', action='store_true', help="decode images every epoch instead of using the dataset cache")
+    train.add_argument('--balance', action='store_true', help="sample classes equally instead of by file count")
+    train.add_argument('--class-ratio', action='append', type=class_ratio, metavar='CLASS=WEIGHT',
+                       help="relative sampling weight for a class (implies --balance); repeatable")
+    train.add_argument('--steps-per-epoch', type=int, default=None, help="batches per epoch when balancing")
+    train.add_argument('--keep-duplicates', action='store_true', help="train on duplicate photos too")
+    train.set_defaults(func=cmd_train)
+
+    dedupe = subparsers.add_parser('dedupe', help="report exact and near-duplicate images in a training folder")
+    dedupe.add_argument('folder')
+    dedupe.add_argument('--max-distance', type=int, default=4, help="max differing hash bits for a near duplicate")
+    dedupe.set_defaults(func=cmd_dedupe)
+
+    scan = subparsers.add_parser('scan', help="verify every training image decodes and quarantine bad ones")
+    scan.add_argument('folder')
+    scan.add_argument('--no-quarantine', action='store_true', help="only report unreadable files, do not move them")
+    scan.set_defaults(func=cmd_scan)
+
+    sweep = subparsers.add_parser('sweep', help="train several configurations in parallel and compare them")
+    sweep.add_argument('folder')
+    sweep.add_argument('--configs', help="JSON file with a list of configurations (default: built-in grid)")
+    sweep.add_argument('--workers', type=int, default=None, help="concurrent training processes")
+    sweep.add_argument('--min-accuracy', type=float, default=0.0, help="validation accuracy bar, 0-1")
+    sweep.set_defaults(func=cmd_sweep)
+
+    classify = subparsers.add_parser('classify', help="classify every image under a folder into a CSV or JSONL file")
+    classify.add_argument('folder')
+    classify.add_argument('--out', required=True, help="results file; .jsonl for JSON lines, anything else for CSV")
+    classify.add_argument('--batch-size', type=int, default=64)
+    classify.add_argument('--model-dir', default='.', help="directory containing trained_model.h5 and class_labels.pkl")
+    classify.add_argument('--backend', choices=('keras', 'tflite-fp16', 'tflite-int8'), default='keras')
+    classify.set_defaults(func=cmd_classify)
+
+    export = subparsers.add_parser('export-tflite', help="convert the trained model to float16 and int8 TFLite")
+    export.add_argument('folder', help="training folder; images are drawn from it to calibrate int8")
+    export.add_argument('--model-dir', default='.')
+    export.add_argument('--compare', action='store_true', help="report accuracy and latency against the Keras model")
+    export.set_defaults(func=cmd_export_tflite)
+
+    bench = subparsers.add_parser('bench-predict', help="compare single-image latency of model.predict and the warmed predictor")
+    bench.add_argument('--model-dir', default='.')
+    bench.add_argument('--runs', type=int, default=50)
+    bench.set_defaults(func=cmd_bench_predict)
+
+    serve = subparsers.add_parser('serve', help="serve predictions over HTTP, batching concurrent requests")
+    serve.add_argument('--host', default='127.0.0.1', help="address to listen on; keep it local unless the network is trusted")
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--model-dir', default='.')
+    serve.add_argument('--backend', choices=('keras', 'tflite-fp16', 'tflite-int8'), default='keras')
+    serve.add_argument('--max-batch-size', type=int, default=32)
+    serve.add_argument('--max-latency-ms', type=float, default=10.0, help="how long a request may wait to be batched")
+    serve.set_defaults(func=cmd_serve)
+
+    watch = subparsers.add_parser('watch', help="classify new images as they are saved into a folder")
+    watch.add_argument('folder')
+    watch.add_argument('--log', default='watch_log.csv', help="results log; .jsonl for JSON lines, anything else for CSV")
+    watch.add_argument('--model-dir', default='.')
+    watch.add_argument('--backend', choices=('keras', 'tflite-fp16', 'tflite-int8'), default='keras')
+    watch.add_argument('--debounce', type=float, default=2.0, help="seconds a file must be unchanged before it is classified")
+    watch.add_argument('--batch-size', type=int, default=64)
+    watch.add_argument('--poll', action='store_true', help="poll the folder instead of using inotify")
+    watch.set_defaults(func=cmd_watch)
+
+    video = subparsers.add_parser('video', help="classify sampled frames of a video into a labelled timeline")
+    video.add_argument('video')
+    video.add_argument('--rate', type=float, default=1.0, help="frames sampled per second of video")
+    video.add_argument('--scene-threshold', type=float, default=None,
+                       help="only classify sampled frames that changed this much (0-1) since the last one")
+    video.add_argument('--out', help="write the timeline as JSON")
+    video.add_argument('--batch-size', type=int, default=32)
+    video.add_argument('--model-dir', default='.')
+    video.add_argument('--backend', choices=('keras', 'tflite-fp16', 'tflite-int8'), default='keras')
+    video.set_defaults(func=cmd_video)
+
+    autotune = subparsers.add_parser('autotune', help="benchmark CPU settings and save the fastest profile")
+    autotune.set_defaults(func=cmd_autotune)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command != 'autotune':
+        # Must happen before anything imports TensorFlow
+        cpu_profile.apply_profile()
+    if args.command == 'train' and args.class_ratio:
+        check_class_ratios(parser, args)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tensorflow.keras.preprocessing.image import img_to_array, load_img
+
+from datasets import IMAGE_EXTENSIONS, IMG_SIZE
+
+# Bulk classification of a directory tree, streamed to CSV or JSONL
+CLASSIFY_BATCH_SIZE = 64
+DECODE_AHEAD = 2  # Batches decoded in the background while the model runs
+
+
+def iter_images(root):
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        for file in sorted(files):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(folder, file)
+
+
+def load_for_prediction(path):
+    # Same preprocessing as predictImage
+    try:
+        return img_to_array(load_img(path, target_size=IMG_SIZE)) / 255.0, None
+    except Exception as e:
+        return None, str(e)
+
+
+def predict_loaded(loaded, predictor):
+    # loaded: (array, error) pairs from load_for_prediction; returns {index: probabilities} for the readable ones
+    good = [i for i, (array, _) in enumerate(loaded) if array is not None]
+    if not good:
+        return {}
+    predictions = predictor.predict(np.stack([loaded[i][0] for i in good]).astype(np.float32))
+    return dict(zip(good, np.asarray(predictions)))
+
+
+class ResultWriter:
+    # Appends one record per image and remembers what an earlier, interrupted run already wrote
+    def __init__(self, output_path, class_labels):
+        self.output_path = output_path
+        self.class_labels = list(class_labels)
+        self.jsonl = output_path.lower().endswith(('.jsonl', '.json'))
+        if os.path.exists(output_path):
+            self.drop_partial_record()
+        self.done = self.read_done()
+        is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.file = open(output_path, 'a', newline='', encoding='utf-8')
+        if not self.jsonl:
+            self.csv = csv.writer(self.file)
+            if is_new:
+                self.csv.writerow(['path', 'label', 'confidence'] + self.class_labels + ['error'])
+
+    def read_done(self):
+        if not os.path.exists(self.output_path):
+            return set()
+        with open(self.output_path, newline='', encoding='utf-8') as f:
+            if self.jsonl:
+                done = set()
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        path = record['path']
+                    except (ValueError, KeyError):
+                        continue
+                    # Every classified record carries the model's classes as its probability keys
+                    if 'probabilities' in record and list(record['probabilities']) != self.class_labels:
+                        raise ValueError(f"{self.output_path} was written by a model with different classes")
+                    done.add(path)
+                return done
+            rows = csv.reader(f)
+            header = next(rows, None)
+            if header and header[3:-1] != self.class_labels:
+                raise ValueError(f"{self.output_path} was written by a model with different classes")
+            return {row[0] for row in rows if len(row) == len(header)}
+
+    def drop_partial_record(self):
+        # An interrupted run can leave half a record at the end of the file. It is cut off rather than
+        # kept, so the file stays parseable line by line and the image is simply written again in full.
+        with open(self.output_path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - 65536)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b'\n')
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position != end:
+                f.truncate(position)
+
+    def write(self, path, probabilities=None, error=None):
+        if probabilities is not None:
+            index = int(np.argmax(probabilities))
+            label, confidence = self.class_labels[index], float(probabilities[index])
+        else:
+            label, confidence = '', None
+        if self.jsonl:
+            record = {'path': path, 'label': label, 'confidence': confidence}
+            if probabilities is not None:
+                record['probabilities'] = dict(zip(self.class_labels, map(float, probabilities)))
+            if error:
+                record['error'] = error
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            probs = [f"{p:.6f}" for p in probabilities] if probabilities is not None else [''] * len(self.class_labels)
+            self.csv.writerow([path, label, '' if confidence is None else f"{confidence:.6f}"] + probs + [error or ''])
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def classify_folder(root, output_path, predictor, class_labels, batch_size=CLASSIFY_BATCH_SIZE, on_progress=None):
+    writer = ResultWriter(output_path, class_labels)
+    paths = [path for path in iter_images(root) if os.path.abspath(path) not in writer.done]
+    total = len(paths)
+    if writer.done:
+        print(f"Resuming: {len(writer.done)} images already classified, {total} remaining")
+
+    batches = [paths[start:start + batch_size] for start in range(0, total, batch_size)]
+    done = 0
+    try:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            # Keep a few batches decoding ahead of the model, never the whole tree
+            pending = deque()
+            for batch in batches[:DECODE_AHEAD]:
+                pending.append((batch, [pool.submit(load_for_prediction, path) for path in batch]))
+            next_batch = DECODE_AHEAD
+            while pending:
+                batch, futures = pending.popleft()
+                if next_batch < len(batches):
+                    pending.append((batches[next_batch], [pool.submit(load_for_prediction, path)
+                                                          for path in batches[next_batch]]))
+                    next_batch += 1
+
+                loaded = [future.result() for future in futures]
+                probabilities = predict_loaded(loaded, predictor)
+                for i, path in enumerate(batch):
+                    writer.write(os.path.abspath(path), probabilities.get(i), loaded[i][1])
+                writer.flush()
+
+                done += len(batch)
+                if on_progress is not None:
+                    on_progress(done, total)
+    finally:
+        writer.close()
+    return done
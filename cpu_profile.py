@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# CPU execution profile: oneDNN kernels, thread pools and XLA JIT.
+# Must be applied before TensorFlow runs its first op, so this module never imports it at top level.
+PROFILE_PATH = 'cpu_profile.json'
+DEFAULT_PROFILE = {
+    'onednn': True,
+    'intra_op_threads': 0,  # 0 lets TensorFlow pick
+    'inter_op_threads': 0,
+    'xla_jit': False,
+}
+BENCH_IMAGES = 256
+BENCH_BATCH_SIZE = 32
+
+
+def load_profile(path=PROFILE_PATH):
+    profile = dict(DEFAULT_PROFILE)
+    try:
+        with open(path) as f:
+            profile.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return profile
+
+
+def save_profile(profile, path=PROFILE_PATH):
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+
+def apply_profile(profile=None):
+    if profile is None:
+        profile = load_profile()
+    if 'tensorflow' in sys.modules:
+        print("Warning: TensorFlow was imported before the CPU profile was applied; oneDNN setting ignored.")
+    os.environ['TF_ENABLE_ONEDNN_OPTS'] = '1' if profile['onednn'] else '0'
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(profile['intra_op_threads'])
+    tf.config.threading.set_inter_op_parallelism_threads(profile['inter_op_threads'])
+    tf.config.optimizer.set_jit(bool(profile['xla_jit']))
+    return profile
+
+
+def candidate_profiles():
+    cores = os.cpu_count() or 1
+    threads = [(0, 0), (cores, 1), (cores, 2)]
+    if cores >= 4:
+        threads.append((cores // 2, 2))
+    candidates = [
+        {'onednn': onednn, 'intra_op_threads': intra, 'inter_op_threads': inter, 'xla_jit': False}
+        for onednn in (True, False)
+        for intra, inter in threads
+    ]
+    candidates.append(dict(DEFAULT_PROFILE, xla_jit=True))
+    return candidates
+
+
+def benchmark():
+    # Runs inside a fresh process that already applied the profile under test
+    import numpy as np
+    from training import build_model
+    from datasets import IMG_SIZE
+
+    images = np.random.rand(BENCH_IMAGES, *IMG_SIZE, 3).astype(np.float32)
+    labels = np.eye(3, dtype=np.float32)[np.random.randint(0, 3, BENCH_IMAGES)]
+    model = build_model(3)
+    model.fit(images[:BENCH_BATCH_SIZE], labels[:BENCH_BATCH_SIZE], epochs=1, verbose=0)
+    model.predict(images[:BENCH_BATCH_SIZE], verbose=0)
+
+    start = time.perf_counter()
+    model.fit(images, labels, batch_size=BENCH_BATCH_SIZE, epochs=1, verbose=0)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.predict(images, batch_size=BENCH_BATCH_SIZE, verbose=0)
+    predict_time = time.perf_counter() - start
+
+    return {
+        'fit_images_per_sec': BENCH_IMAGES / fit_time,
+        'predict_images_per_sec': BENCH_IMAGES / predict_time,
+    }
+
+
+def autotune(path=PROFILE_PATH):
+    # Every candidate gets its own process because thread pools and oneDNN cannot be changed once TensorFlow is running
+    results = []
+    for profile in candidate_profiles():
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--bench', json.dumps(profile)],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            print(f"{profile}: failed\n{completed.stderr.strip()[-500:]}")
+            continue
+        metrics = json.loads(completed.stdout.strip().splitlines()[-1])
+        # Geometric mean so neither training nor inference dominates the choice
+        metrics['score'] = (metrics['fit_images_per_sec'] * metrics['predict_images_per_sec']) ** 0.5
+        print(f"{profile}: fit {metrics['fit_images_per_sec']:.1f} img/s, "
+              f"predict {metrics['predict_images_per_sec']:.1f} img/s")
+        results.append((metrics['score'], profile))
+
+    if not results:
+        print("No profile could be benchmarked; keeping the current one.")
+        return None
+    best = max(results, key=lambda result: result[0])[1]
+    save_profile(best, path)
+    print(f"Saved best profile to {path}: {best}")
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune TensorFlow CPU settings for this machine")
+    parser.add_argument('--autotune', action='store_true', help="benchmark candidate profiles and save the fastest")
+    parser.add_argument('--bench', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        apply_profile(json.loads(args.bench))
+        print(json.dumps(benchmark()))
+    elif args.autotune:
+        autotune()
+    else:
+        print(json.dumps(load_profile(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tensorflow.keras.preprocessing.image import img_to_array, load_img
+
+from datasets import IMG_SIZE, list_image_files
+
+# Decoded training images live next to trained_model.h5
+CACHE_DIR = 'dataset_cache'
+COPY_CHUNK = 256
+
+
+def file_signature(path):
+    # Size and mtime identify an unchanged file without reading it
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+
+def load_image_uint8(path):
+    # Same decode and resize as predictImage, kept as uint8 (rescaling happens in the pipeline)
+    return img_to_array(load_img(path, target_size=IMG_SIZE), dtype=np.uint8)
+
+
+class DatasetCache:
+    # Decoded 150x150x3 images in a memory-mapped uint8 array, plus labels and a manifest
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.images_path = os.path.join(cache_dir, 'images.npy')
+        self.labels_path = os.path.join(cache_dir, 'labels.npy')
+        self.manifest_path = os.path.join(cache_dir, 'manifest.json')
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            images = np.load(self.images_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return {'class_names': [], 'paths': [], 'entries': {}}, None
+        # A manifest that does not describe the array on disk is useless
+        if manifest.get('count') != len(images):
+            return {'class_names': [], 'paths': [], 'entries': {}}, None
+        return manifest, images
+
+    def open(self):
+        manifest, images = self.load_manifest()
+        labels = np.load(self.labels_path, mmap_mode='r') if images is not None else None
+        return images, labels, manifest['class_names'], manifest['paths']
+
+    def sync(self, folder_path, paths=None, labels=None, class_names=None):
+        # Bring the cache in line with the folder, decoding only files that were added or changed
+        if paths is None:
+            paths, labels, class_names = list_image_files(folder_path)
+        paths = [os.path.abspath(path) for path in paths]
+        manifest, old_images = self.load_manifest()
+        old_entries = manifest['entries']
+
+        entries = {}
+        reused = {}
+        to_decode = []
+        for index, (path, label) in enumerate(zip(paths, labels)):
+            signature = file_signature(path)
+            old = old_entries.get(path)
+            if old is not None and old['size'] == signature['size'] and old['mtime'] == signature['mtime']:
+                reused[index] = old['index']
+            else:
+                to_decode.append(index)
+            entries[path] = dict(signature, index=index, label=int(label))
+
+        unchanged = (not to_decode and len(paths) == len(old_entries)
+                     and all(old == new for new, old in reused.items()))
+        if unchanged:
+            if manifest['class_names'] != list(class_names):
+                self.write_labels(labels)
+                self.write_manifest(class_names, paths, entries)
+            return self.open()
+
+        print(f"Dataset cache: {len(reused)} images reused, {len(to_decode)} to decode, "
+              f"{len(old_entries) - len(reused)} removed")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.images_path + '.tmp.npy'
+        images = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=(len(paths),) + IMG_SIZE + (3,))
+
+        # Reused rows are plain memory copies, in chunks to keep resident memory bounded
+        reused_items = sorted(reused.items())
+        for start in range(0, len(reused_items), COPY_CHUNK):
+            chunk = reused_items[start:start + COPY_CHUNK]
+            new_indices = [new for new, _ in chunk]
+            old_indices = [old for _, old in chunk]
+            images[new_indices] = old_images[old_indices]
+
+        def decode(index):
+            images[index] = load_image_uint8(paths[index])
+
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            list(pool.map(decode, to_decode))
+
+        images.flush()
+        del images, old_images
+        os.replace(tmp_path, self.images_path)
+        self.write_labels(labels)
+        self.write_manifest(class_names, paths, entries)
+        return self.open()
+
+    def write_labels(self, labels):
+        np.save(self.labels_path, np.asarray(labels, dtype=np.int64))
+
+    def write_manifest(self, class_names, paths, entries):
+        manifest = {'class_names': list(class_names), 'count': len(paths), 'paths': paths, 'entries': entries}
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
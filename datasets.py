@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import tensorflow as tf
+
+IMG_SIZE = (150, 150)
+BATCH_SIZE = 32
+AUTOTUNE = tf.data.AUTOTUNE
+# Formats tf.io.decode_image can decode in-graph
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+SHUFFLE_BUFFER = 1000
+
+
+def list_image_files(folder_path):
+    # Same class mapping as flow_from_directory: one class per sub-folder, sorted by name
+    class_names = sorted(d for d in os.listdir(folder_path) if os.path.isdir(os.path.join(folder_path, d)))
+    paths, labels = [], []
+    for index, name in enumerate(class_names):
+        for root, dirs, files in os.walk(os.path.join(folder_path, name)):
+            dirs.sort()
+            for file in sorted(files):
+                if file.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(root, file))
+                    labels.append(index)
+    return paths, labels, class_names
+
+
+def split_indices(labels, validation_split, seed=0):
+    # Stratified, deterministic split so every class keeps a share of held-out images
+    rng = np.random.default_rng(seed)
+    labels = np.asarray(labels)
+    train, validation = [], []
+    for label in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == label))
+        count = int(len(members) * validation_split)
+        validation.extend(members[:count].tolist())
+        train.extend(members[count:].tolist())
+    return sorted(train), sorted(validation)
+
+
+def decode_image(path):
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    # Nearest-neighbour matches load_img's default resampling used at prediction time
+    image = tf.image.resize(image, IMG_SIZE, method='nearest')
+    image.set_shape(IMG_SIZE + (3,))
+    return image
+
+
+def nearest_indices(out_size, in_size):
+    # Source pixel for each output pixel, accumulated step by step exactly as PIL's NEAREST does,
+    # so results match load_img bit for bit
+    scale = in_size / out_size
+    steps = np.full(out_size, scale)
+    steps[0] = scale * 0.5
+    return np.cumsum(steps).astype(np.intp)
+
+
+def resize_nearest(image, size=IMG_SIZE):
+    # Nearest-neighbour resize of an (h, w, 3) array. Works on strided views and only copies the small output.
+    rows = nearest_indices(size[0], image.shape[0])
+    cols = nearest_indices(size[1], image.shape[1])
+    return image[rows[:, None], cols[None, :]]
+
+
+def rescale(images, labels):
+    return tf.cast(images, tf.float32) / 255.0, labels
+
+
+def make_dataset(paths, labels, num_classes, batch_size=BATCH_SIZE, shuffle=True, cache=False, prefetch=True):
+    # cache: False to decode every epoch, True to cache decoded images in memory, or a file path
+    def load(path, label):
+        return decode_image(path), tf.one_hot(label, num_classes)
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    if cache is False:
+        if shuffle:
+            dataset = dataset.shuffle(len(paths), reshuffle_each_iteration=True)
+        dataset = dataset.map(load, num_parallel_calls=AUTOTUNE)
+    else:
+        dataset = dataset.map(load, num_parallel_calls=AUTOTUNE)
+        dataset = dataset.cache('' if cache is True else cache)
+        if shuffle:
+            dataset = dataset.shuffle(min(len(paths), SHUFFLE_BUFFER), reshuffle_each_iteration=True)
+
+    # Rescale whole uint8 batches in-graph instead of per image in Python
+    dataset = dataset.batch(batch_size).map(rescale, num_parallel_calls=AUTOTUNE)
+    if prefetch:
+        dataset = dataset.prefetch(AUTOTUNE)
+    return dataset
+
+
+def gather_rows(row_batches, images, labels, num_classes, prefetch=True):
+    # Turns a dataset of row-index batches into (image, one-hot label) batches read from a
+    # (memory-mapped) uint8 array, so no image is decoded
+    labels = np.asarray(labels, dtype=np.int64)
+
+    def gather(rows):
+        # Sorted indices turn the gather into mostly sequential reads of the memory map
+        rows = np.sort(rows)
+        return np.ascontiguousarray(images[rows]), labels[rows]
+
+    def load(rows):
+        batch_images, batch_labels = tf.numpy_function(gather, [rows], (tf.uint8, tf.int64))
+        batch_images.set_shape((None,) + IMG_SIZE + (3,))
+        batch_labels.set_shape((None,))
+        return batch_images, tf.one_hot(batch_labels, num_classes)
+
+    dataset = row_batches.map(load, num_parallel_calls=AUTOTUNE).map(rescale, num_parallel_calls=AUTOTUNE)
+    if prefetch:
+        dataset = dataset.prefetch(AUTOTUNE)
+    return dataset
+
+
+def make_array_dataset(images, labels, num_classes, batch_size=BATCH_SIZE, shuffle=True, prefetch=True, indices=None):
+    # indices restricts the dataset to a subset of rows
+    rows = np.arange(len(images)) if indices is None else np.asarray(indices, dtype=np.int64)
+    dataset = tf.data.Dataset.from_tensor_slices(rows)
+    if shuffle:
+        dataset = dataset.shuffle(len(rows), reshuffle_each_iteration=True)
+    return gather_rows(dataset.batch(batch_size), images, labels, num_classes, prefetch)
+
+
+def make_balanced_dataset(images, labels, num_classes, batch_size=BATCH_SIZE, indices=None, ratios=None, prefetch=True):
+    # Endless class-balanced stream: one shuffled, repeating iterator per class, mixed according to
+    # ratios (one weight per class index; None means equal). Epochs are defined by steps_per_epoch.
+    rows = np.arange(len(images)) if indices is None else np.asarray(indices, dtype=np.int64)
+    row_labels = np.asarray(labels)[rows]
+    per_class, weights = [], []
+    for label in range(num_classes):
+        members = rows[row_labels == label]
+        weight = 1.0 if ratios is None else float(ratios[label])
+        if len(members) == 0 or weight <= 0:
+            continue
+        per_class.append(tf.data.Dataset.from_tensor_slices(members)
+                         .shuffle(len(members), reshuffle_each_iteration=True).repeat())
+        weights.append(weight)
+    total = sum(weights)
+    dataset = tf.data.Dataset.sample_from_datasets(per_class, weights=[w / total for w in weights])
+    return gather_rows(dataset.batch(batch_size), images, labels, num_classes, prefetch)
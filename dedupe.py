@@ -0,0 +1,153 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from dataset_cache import file_signature
+
+# Persistent perceptual-hash index so re-scans only hash new or changed files
+HASH_INDEX_PATH = 'phash_index.json'
+REPORT_PATH = 'dedupe_report.json'
+HASH_SIZE = 32  # Images are reduced to 32x32 greyscale before the DCT
+HASH_BATCH = 256
+NEAR_DUPLICATE_DISTANCE = 4  # Max differing bits out of 64
+
+
+def dct_matrix(size):
+    n = np.arange(size)
+    matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size)) * np.sqrt(2.0 / size)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+DCT = dct_matrix(HASH_SIZE)
+
+
+def load_greyscale(path):
+    with Image.open(path) as img:
+        # Let the JPEG decoder downscale while decoding; far cheaper than a full decode
+        img.draft('L', (HASH_SIZE * 2, HASH_SIZE * 2))
+        return np.asarray(img.convert('L').resize((HASH_SIZE, HASH_SIZE), Image.BILINEAR), dtype=np.float32)
+
+
+def phash_batch(pixels):
+    # pHash for a whole (N, 32, 32) batch at once: 2-D DCT, keep the 8x8 low frequencies, threshold at the median
+    coefficients = DCT @ pixels @ DCT.T
+    low = coefficients[:, :8, :8].reshape(len(pixels), 64)
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    bits = np.packbits(low > median, axis=1)
+    return bits.view('>u8').ravel().astype(np.uint64)
+
+
+def popcount(values):
+    return np.unpackbits(values.astype('>u8').view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class HashIndex:
+    def __init__(self, path=HASH_INDEX_PATH):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def hashes(self, paths):
+        paths = [os.path.abspath(path) for path in paths]
+        signatures = [file_signature(path) for path in paths]
+        result = np.zeros(len(paths), dtype=np.uint64)
+        missing = []
+        for i, (path, signature) in enumerate(zip(paths, signatures)):
+            entry = self.entries.get(path)
+            if entry is not None and entry['size'] == signature['size'] and entry['mtime'] == signature['mtime']:
+                result[i] = np.uint64(int(entry['hash'], 16))
+            else:
+                missing.append(i)
+
+        if missing:
+            print(f"Hashing {len(missing)} of {len(paths)} images")
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            for start in range(0, len(missing), HASH_BATCH):
+                chunk = missing[start:start + HASH_BATCH]
+                pixels = np.stack(list(pool.map(load_greyscale, [paths[i] for i in chunk])))
+                for i, value in zip(chunk, phash_batch(pixels)):
+                    result[i] = value
+                    self.entries[paths[i]] = dict(signatures[i], hash=f"{int(value):016x}")
+
+        # Forget files that are gone so the index does not grow forever
+        live = set(paths)
+        self.entries = {path: entry for path, entry in self.entries.items()
+                        if path in live or os.path.exists(path)}
+        self.save()
+        return result
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def find_duplicates(hashes, max_distance=NEAR_DUPLICATE_DISTANCE):
+    # Split the 64 bits into max_distance + 1 bands: any pair within max_distance bits agrees exactly
+    # on at least one band, so only images sharing a band value are compared.
+    parent = list(range(len(hashes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    edges = np.linspace(0, 64, max_distance + 2).astype(int)
+    for low, high in zip(edges[:-1], edges[1:]):
+        keys = (hashes >> np.uint64(low)) & np.uint64((1 << int(high - low)) - 1)
+        order = np.argsort(keys, kind='stable')
+        for group in np.split(order, np.flatnonzero(np.diff(keys[order])) + 1):
+            if len(group) < 2:
+                continue
+            values = hashes[group]
+            distances = popcount((values[:, None] ^ values[None, :]).ravel()).reshape(len(group), len(group))
+            for a, b in zip(*np.nonzero(np.triu(distances <= max_distance, 1))):
+                i, j = sorted((int(group[a]), int(group[b])))
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups = {}
+    for i in range(len(hashes)):
+        groups.setdefault(find(i), []).append(i)
+
+    # Union-find chains near duplicates (A~B~C with A far from C), so within each group files are
+    # walked in sorted path order: a file within max_distance of a file already kept is a duplicate
+    # of the nearest one, anything else is kept too
+    duplicates = {}
+    for members in groups.values():
+        keepers = [members[0]]
+        for i in members[1:]:
+            distances = popcount(hashes[keepers] ^ hashes[i])
+            nearest = int(np.argmin(distances))
+            if distances[nearest] <= max_distance:
+                duplicates[i] = (keepers[nearest], int(distances[nearest]))
+            else:
+                keepers.append(i)
+    return duplicates
+
+
+def dedupe(paths, labels, max_distance=NEAR_DUPLICATE_DISTANCE, index_path=HASH_INDEX_PATH):
+    # Returns the kept paths and labels plus a report of every excluded file
+    hashes = HashIndex(index_path).hashes(paths)
+    duplicates = find_duplicates(hashes, max_distance)
+    report = [{'path': paths[i], 'duplicate_of': paths[keeper], 'distance': distance,
+               'kind': 'exact' if distance == 0 else 'near', 'cross_class': labels[i] != labels[keeper]}
+              for i, (keeper, distance) in sorted(duplicates.items())]
+    keep = [i for i in range(len(paths)) if i not in duplicates]
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    if report:
+        exact = sum(entry['kind'] == 'exact' for entry in report)
+        print(f"Deduplication: excluded {len(report)} of {len(paths)} images "
+              f"({exact} exact, {len(report) - exact} near duplicates); see {REPORT_PATH}")
+    return [paths[i] for i in keep], [labels[i] for i in keep], report
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tensorflow as tf
+
+from datasets import AUTOTUNE, BATCH_SIZE
+from dataset_cache import file_signature
+
+# Trunk feature vectors, one .npy per image content hash, grouped by trunk weights
+EMBEDDING_DIR = 'embedding_cache'
+EMBED_BATCH_SIZE = 64
+DIGEST_INDEX_PATH = 'content_digests.json'
+
+
+def content_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DigestIndex:
+    # content_hash results keyed by absolute path, reused while a file's size and mtime are unchanged,
+    # so an unchanged folder is not re-read in full on every head-only retrain
+    def __init__(self, path=DIGEST_INDEX_PATH):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def digests(self, paths):
+        paths = [os.path.abspath(path) for path in paths]
+        signatures = [file_signature(path) for path in paths]
+        result = [None] * len(paths)
+        missing = []
+        for i, (path, signature) in enumerate(zip(paths, signatures)):
+            entry = self.entries.get(path)
+            if entry is not None and entry['size'] == signature['size'] and entry['mtime'] == signature['mtime']:
+                result[i] = entry['digest']
+            else:
+                missing.append(i)
+
+        if missing:
+            print(f"Embedding cache: hashing {len(missing)} of {len(paths)} files")
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            for i, digest in zip(missing, pool.map(content_hash, [paths[i] for i in missing])):
+                result[i] = digest
+                self.entries[paths[i]] = dict(signatures[i], digest=digest)
+
+        # Forget files that are gone so the index does not grow forever
+        live = set(paths)
+        self.entries = {path: entry for path, entry in self.entries.items()
+                        if path in live or os.path.exists(path)}
+        self.save()
+        return result
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def split_model(model):
+    # Trunk is everything up to and including Flatten; the dense layers after it form the head
+    flatten_index = next(i for i, layer in enumerate(model.layers) if isinstance(layer, tf.keras.layers.Flatten))
+    trunk = tf.keras.Model(model.inputs, model.layers[flatten_index].output)
+    return trunk, model.layers[flatten_index + 1:]
+
+
+def trunk_fingerprint(trunk):
+    # Embeddings are only valid for the exact trunk weights that produced them
+    digest = hashlib.sha1()
+    for weights in trunk.get_weights():
+        digest.update(np.ascontiguousarray(weights).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class CachedFeatures:
+    # (N, feature_dim) array-like over the per-image .npy files. Rows are read when a batch asks for
+    # them, so the features are never copied into a second full-size file.
+    def __init__(self, files, feature_dim):
+        self.files = files
+        self.shape = (len(files), feature_dim)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, indices):
+        return np.stack([np.load(self.files[i]) for i in np.atleast_1d(indices)])
+
+
+class EmbeddingCache:
+    def __init__(self, trunk, cache_dir=EMBEDDING_DIR):
+        self.trunk = trunk
+        fingerprint = trunk_fingerprint(trunk)
+        # Features from any other trunk can never be used again, and each set is ~166 KB per image
+        for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+            if name != fingerprint:
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        self.cache_dir = os.path.join(cache_dir, fingerprint)
+        self.feature_dim = int(np.prod(trunk.output_shape[1:]))
+
+    def path_for(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], digest + '.npy')
+
+    def features(self, paths, images):
+        # images: uint8 array (typically the DatasetCache memory map) with one row per path.
+        # Returns a float16 (N, feature_dim) CachedFeatures of trunk outputs.
+        digests = DigestIndex().digests(paths)
+
+        missing = [i for i, digest in enumerate(digests) if not os.path.exists(self.path_for(digest))]
+        if missing:
+            print(f"Embedding cache: computing {len(missing)} of {len(paths)} feature vectors")
+        for start in range(0, len(missing), EMBED_BATCH_SIZE):
+            chunk = missing[start:start + EMBED_BATCH_SIZE]
+            batch = images[chunk].astype(np.float32) / 255.0
+            outputs = self.trunk.predict_on_batch(batch).reshape(len(chunk), -1).astype(np.float16)
+            for index, output in zip(chunk, outputs):
+                path = self.path_for(digests[index])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                np.save(path, output)
+
+        return CachedFeatures([self.path_for(digest) for digest in digests], self.feature_dim)
+
+
+def make_feature_dataset(features, labels, num_classes, batch_size=BATCH_SIZE, shuffle=True):
+    labels = np.asarray(labels, dtype=np.int64)
+
+    def gather(positions):
+        indices = np.sort(positions)
+        return features[indices].astype(np.float32), labels[indices]
+
+    def load(positions):
+        batch_features, batch_labels = tf.numpy_function(gather, [positions], (tf.float32, tf.int64))
+        batch_features.set_shape((None, features.shape[1]))
+        batch_labels.set_shape((None,))
+        return batch_features, tf.one_hot(batch_labels, num_classes)
+
+    dataset = tf.data.Dataset.range(len(features))
+    if shuffle:
+        dataset = dataset.shuffle(len(features), reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).map(load, num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import tensorflow as tf
+
+from datasets import IMG_SIZE
+from tflite_predictor import FP16_MODEL_PATH, INT8_MODEL_PATH, TFLitePredictor
+from training import MODEL_PATH
+
+BENCHMARK_RUNS = 50
+TFLITE_BACKENDS = {'tflite-fp16': FP16_MODEL_PATH, 'tflite-int8': INT8_MODEL_PATH}
+BACKENDS = ('keras',) + tuple(TFLITE_BACKENDS)
+PREDICTION_CACHE_DIR = 'prediction_cache'
+MEMORY_CACHE_SIZE = 256
+DISK_CACHE_SIZE = 5000  # Entries (~1 KB each plus file system overhead) kept in prediction_cache
+# Test-time augmentation: numpy equivalents of the editor's 90-degree rotations and horizontal mirror, which
+# themselves stay on QTransform / QImage.mirrored in main_real
+TTA_VARIANTS = {
+    'identity': lambda images: images,
+    'rotate_left': lambda images: np.rot90(images, 1, axes=(1, 2)),
+    'rotate_right': lambda images: np.rot90(images, -1, axes=(1, 2)),
+    'rotate_180': lambda images: np.rot90(images, 2, axes=(1, 2)),
+    'mirror': lambda images: images[:, :, ::-1],
+}
+
+
+class Predictor:
+    # Interactive inference path: a single tf.function with a fixed input signature that calls the model
+    # directly, skipping model.predict's data adapter and batch loop. Traced once, at construction.
+    def __init__(self, model):
+        self.model = model
+        self.forward = tf.function(
+            lambda images: model(images, training=False),
+            input_signature=[tf.TensorSpec((None,) + IMG_SIZE + (3,), tf.float32)]
+        )
+        self.warm_up()
+
+    def warm_up(self):
+        # Pays graph tracing now so the user's first click is as fast as the hundredth
+        self.predict(np.zeros((1,) + IMG_SIZE + (3,), np.float32))
+
+    def predict(self, images):
+        # images: (N, 150, 150, 3) float32 scaled to [0, 1]; returns (N, classes) probabilities
+        return self.forward(tf.convert_to_tensor(images, tf.float32)).numpy()
+
+
+def benchmark_latency(model, runs=BENCHMARK_RUNS):
+    # Single-image latency in milliseconds: model.predict (the old path) against Predictor
+    sample = np.random.rand(1, *IMG_SIZE, 3).astype(np.float32)
+
+    def timed(function):
+        start = time.perf_counter()
+        function()
+        return (time.perf_counter() - start) * 1000
+
+    results = {'predict_first_ms': timed(lambda: model.predict(sample, verbose=0))}
+    results['predict_ms'] = np.median([timed(lambda: model.predict(sample, verbose=0)) for _ in range(runs)])
+
+    predictor = []
+    results['predictor_warmup_ms'] = timed(lambda: predictor.append(Predictor(model)))
+    predictor = predictor[0]
+    results['predictor_first_ms'] = timed(lambda: predictor.predict(sample))
+    results['predictor_ms'] = np.median([timed(lambda: predictor.predict(sample)) for _ in range(runs)])
+    return results
+
+
+def tflite_path(backend, model_dir='.'):
+    # The exported file is only usable if it was made from the current trained_model.h5
+    path = os.path.join(model_dir, TFLITE_BACKENDS[backend])
+    model_path = os.path.join(model_dir, MODEL_PATH)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(model_path):
+        return None
+    return path
+
+
+def load_predictor(model, backend='keras', model_dir='.'):
+    if backend == 'keras':
+        return Predictor(model)
+    path = tflite_path(backend, model_dir)
+    if path is None:
+        raise FileNotFoundError(f"No up-to-date {TFLITE_BACKENDS[backend]}; run 'python -m agrinova export-tflite' first")
+    return TFLitePredictor(path)
+
+
+def model_version(backend='keras', model_dir='.'):
+    # Changes whenever trained_model.h5 is rewritten, which invalidates every cached prediction
+    stat = os.stat(os.path.join(model_dir, MODEL_PATH))
+    return hashlib.sha1(f"{backend}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+class CachedPredictor:
+    # Content-addressed prediction cache in front of any predictor. Keys hash the preprocessed input
+    # tensor together with the model version; an in-memory LRU tier sits over an optional on-disk tier,
+    # which is also least-recently-used and capped at disk_capacity files.
+    def __init__(self, predictor, version, capacity=MEMORY_CACHE_SIZE, cache_dir=None, disk_capacity=DISK_CACHE_SIZE):
+        self.predictor = predictor
+        self.version = version
+        self.capacity = capacity
+        self.disk_capacity = disk_capacity
+        self.disk_count = 0
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.cache_dir = None
+        if cache_dir is not None:
+            # Entries from older model versions can never be hit again
+            for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+                if name != version:
+                    shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+            self.cache_dir = os.path.join(cache_dir, version)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.disk_count = len(os.listdir(self.cache_dir))
+
+    def key(self, image):
+        digest = hashlib.sha1(self.version.encode())
+        digest.update(np.ascontiguousarray(image, np.float32).tobytes())
+        return digest.hexdigest()
+
+    def lookup(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, key + '.npy')
+            try:
+                probabilities = np.load(path)
+                os.utime(path)  # The modification time doubles as the disk tier's last-used time
+            except (OSError, ValueError):
+                return None
+            self.remember(key, probabilities)
+            return probabilities
+        return None
+
+    def remember(self, key, probabilities):
+        with self.lock:
+            self.memory[key] = probabilities
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.capacity:
+                self.memory.popitem(last=False)
+
+    def predict(self, images):
+        keys = [self.key(image) for image in images]
+        results = [self.lookup(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            predictions = self.predictor.predict(np.stack([images[i] for i in missing]))
+            for i, probabilities in zip(missing, predictions):
+                results[i] = probabilities
+                self.remember(keys[i], probabilities)
+                if self.cache_dir is not None:
+                    self.store(keys[i], probabilities)
+        return np.stack(results)
+
+    def store(self, key, probabilities):
+        np.save(os.path.join(self.cache_dir, key + '.npy'), probabilities)
+        with self.lock:
+            self.disk_count += 1
+            if self.disk_count <= self.disk_capacity:
+                return
+            # Evict down to 90% in one pass so the directory is not listed on every new entry
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+                except OSError:
+                    pass
+            entries.sort()
+            excess = len(entries) - int(self.disk_capacity * 0.9)
+            for _, path in entries[:max(0, excess)]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.disk_count = len(entries) - max(0, excess)
+
+
+class TTAPredictor:
+    # Averages each image's probabilities over several orientations. All variants of the whole input
+    # go through the wrapped predictor as one batch, so the cost is one forward pass, not one per variant.
+    def __init__(self, predictor, variants=tuple(TTA_VARIANTS)):
+        self.predictor = predictor
+        self.variants = variants
+
+    def augment(self, images):
+        # (N, H, W, 3) -> (N * variants, H, W, 3) with each image's variants next to each other
+        images = np.asarray(images, np.float32)
+        batch = np.stack([TTA_VARIANTS[name](images) for name in self.variants], axis=1)
+        return batch.reshape((-1,) + images.shape[1:])
+
+    def predict(self, images):
+        predictions = np.asarray(self.predictor.predict(self.augment(images)))
+        return predictions.reshape(len(images), len(self.variants), -1).mean(axis=1)
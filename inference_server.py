@@ -0,0 +1,146 @@
+import io
+import json
+import queue
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+
+from datasets import IMG_SIZE
+
+# Local prediction service: one copy of the model shared by every client on the machine
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BATCH_SIZE = 32
+MAX_LATENCY_MS = 10.0  # Longest a request waits for others to join its batch
+MAX_UPLOAD_BYTES = 32 * 1024 * 1024
+
+
+def decode_image_bytes(data):
+    # Same preprocessing as predictImage: RGB, nearest-neighbour resize to IMG_SIZE, scaled to [0, 1]
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert('RGB').resize((IMG_SIZE[1], IMG_SIZE[0]), Image.NEAREST)
+        return np.asarray(img, np.float32) / 255.0
+
+
+def prediction_payload(probabilities, class_labels):
+    index = int(np.argmax(probabilities))
+    return {'label': class_labels[index], 'confidence': float(probabilities[index]),
+            'probabilities': dict(zip(class_labels, map(float, probabilities)))}
+
+
+class MicroBatcher:
+    # Groups requests that arrive close together into one predictor call. A batch runs as soon as it
+    # is full or its oldest request has waited max_latency_ms, whichever comes first.
+    def __init__(self, predictor, max_batch_size=MAX_BATCH_SIZE, max_latency_ms=MAX_LATENCY_MS):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.requests = queue.Queue()
+        self.stats = {'requests': 0, 'batches': 0}
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, image):
+        future = Future()
+        self.requests.put((image, future))
+        return future
+
+    def collect(self):
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.collect()
+            try:
+                predictions = self.predictor.predict(np.stack([image for image, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), probabilities in zip(batch, predictions):
+                    future.set_result(np.asarray(probabilities))
+            self.stats['requests'] += len(batch)
+            self.stats['batches'] += 1
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    # POST /predict with the raw image file as the body; GET /health for a liveness check
+    server_version = 'AgrinovaInference/1.0'
+
+    def do_GET(self):
+        if self.path != '/health':
+            self.send_json(404, {'error': f"unknown path {self.path}"})
+            return
+        stats = self.server.batcher.stats
+        self.send_json(200, {'status': 'ok', 'backend': self.server.backend, 'classes': self.server.class_labels,
+                             'requests': stats['requests'], 'batches': stats['batches']})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self.send_json(404, {'error': f"unknown path {self.path}"})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            self.send_json(400, {'error': "request body must be an image file"})
+            return
+        if length > MAX_UPLOAD_BYTES:
+            self.send_json(413, {'error': f"images larger than {MAX_UPLOAD_BYTES} bytes are not accepted"})
+            return
+        # Decoding runs on this request's thread, so only inference is serialised through the batcher
+        try:
+            image = decode_image_bytes(self.rfile.read(length))
+        except Exception as e:
+            self.send_json(400, {'error': f"could not decode image: {e}"})
+            return
+        try:
+            probabilities = self.server.batcher.submit(image).result()
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+            return
+        self.send_json(200, prediction_payload(probabilities, self.server.class_labels))
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # A scanner posting thousands of images would otherwise flood the console
+
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, predictor, class_labels, backend='keras',
+                 max_batch_size=MAX_BATCH_SIZE, max_latency_ms=MAX_LATENCY_MS):
+        super().__init__(address, PredictionHandler)
+        self.class_labels = list(class_labels)
+        self.backend = backend
+        self.batcher = MicroBatcher(predictor, max_batch_size, max_latency_ms)
+
+
+def predict_remote(image_path, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"):
+    # Client side: returns the same {label, confidence, probabilities} payload the server sends
+    with open(image_path, 'rb') as f:
+        request = urllib.request.Request(url + '/predict', data=f.read(), method='POST',
+                                         headers={'Content-Type': 'application/octet-stream'})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
@@ -1,21 +1,200 @@
 import sys
-from PyQt5.QtGui import QGuiApplication, QFontDatabase, QFont, QIcon, QImage, QPixmap, QTransform
+from PyQt5.QtGui import QGuiApplication, QFontDatabase, QFont, QIcon, QImage, QPainter, QPixmap, QTransform
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QHBoxLayout, QVBoxLayout, QPushButton, QLabel, QWidget, QFileDialog, QProgressBar, QMessageBox, QScrollArea, QCheckBox, QMenu
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import os
-from tensorflow.keras.preprocessing.image import ImageDataGenerator, img_to_array, load_img
+import threading
+import importlib
+import cpu_profile
 import numpy as np
-import tensorflow as tf
 import pickle
 from PyQt5.QtGui import QIcon
 
-# Disable oneDNN optimization warning
-os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
+ml_lock = threading.Lock()
+ml_loaded = False
+
+def import_ml(name):
+    # The first ML import applies the tuned CPU profile (oneDNN, thread pools, XLA), which has to
+    # happen before TensorFlow is loaded
+    global ml_loaded
+    with ml_lock:
+        if not ml_loaded:
+            cpu_profile.apply_profile()
+            ml_loaded = True
+    return importlib.import_module(name)
+
+class LazyModule:
+    # Stands in for a module that pulls in TensorFlow. Importing TensorFlow takes seconds, so it is
+    # deferred until an attribute is first used instead of delaying the sign-in window.
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(import_ml(self.name), attr)
+
+tf = LazyModule('tensorflow')
+training = LazyModule('training')
+batch_classify = LazyModule('batch_classify')
+datasets = LazyModule('datasets')
+inference = LazyModule('inference')
+tiled_inference = LazyModule('tiled_inference')
+watch_folder = LazyModule('watch_folder')
+video_classify = LazyModule('video_classify')
+
+def preload_model():
+    # The slow, widget-free part of opening the main window: importing TensorFlow, reading
+    # trained_model.h5 and tracing the predictor. Safe to run on a background thread.
+    if not (os.path.exists('trained_model.h5') and os.path.exists('class_labels.pkl')):
+        import_ml('inference')  # No saved model yet, but training and prediction will need the ML stack
+        return None
+    model = tf.keras.models.load_model('trained_model.h5')
+    with open('class_labels.pkl', 'rb') as f:
+        class_labels = pickle.load(f)
+    return {'model': model, 'class_labels': class_labels, 'predictor': inference.load_predictor(model)}
+
+def qimage_to_array(image):
+    # Zero-copy (height, width, 3) RGB view of a QImage's pixels. The view borrows the QImage's
+    # buffer, so it is returned together with the image that owns it.
+    if image.format() not in (QImage.Format_RGB32, QImage.Format_ARGB32, QImage.Format_ARGB32_Premultiplied):
+        image = image.convertToFormat(QImage.Format_RGB32)
+    bits = image.constBits()
+    bits.setsize(image.bytesPerLine() * image.height())
+    pixels = np.frombuffer(bits, np.uint8).reshape(image.height(), image.bytesPerLine())
+    pixels = pixels[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+    # 32-bit pixels are 0xAARRGGBB words: B, G, R, A in memory on little-endian machines
+    rgb = pixels[..., 2::-1] if sys.byteorder == 'little' else pixels[..., 1:]
+    return rgb, image
+
+class TrainingWorker(QThread):
+    # Runs model training off the GUI thread and reports real per-batch progress
+    progress = pyqtSignal(dict)
+    trained = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, folder_path, mode='full', options=None, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path
+        self.mode = mode
+        self.options = options or {}
+
+    def run(self):
+        try:
+            result = training.TRAINING_MODES[self.mode](self.folder_path, on_progress=self.progress.emit, **self.options)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.trained.emit(result)
+
+class ClassifyFolderWorker(QThread):
+    # Classifies a whole directory tree in batches off the GUI thread
+    progress = pyqtSignal(int, int)
+    classified = pyqtSignal(int, str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, folder_path, output_path, predictor, class_labels, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path
+        self.output_path = output_path
+        self.predictor = predictor
+        self.class_labels = class_labels
+
+    def run(self):
+        try:
+            done = batch_classify.classify_folder(self.folder_path, self.output_path, self.predictor,
+                                                  self.class_labels, on_progress=self.progress.emit)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.classified.emit(done, self.output_path)
+
+class WatchFolderWorker(QThread):
+    # Classifies images as they arrive in a watched folder until stop() is called
+    classified = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, folder_path, log_path, predictor, class_labels, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path
+        self.log_path = log_path
+        self.predictor = predictor
+        self.class_labels = class_labels
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        try:
+            watch_folder.watch_folder(self.folder_path, self.predictor, self.class_labels, self.log_path,
+                                      on_results=self.classified.emit, stop=self.stop_event)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class VideoWorker(QThread):
+    # Classifies sampled frames of a video file off the GUI thread
+    progress = pyqtSignal(float, float)
+    classified = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, video_path, predictor, class_labels, parent=None):
+        super().__init__(parent)
+        self.video_path = video_path
+        self.predictor = predictor
+        self.class_labels = class_labels
+
+    def run(self):
+        try:
+            timeline = video_classify.classify_video(self.video_path, self.predictor, self.class_labels,
+                                                     on_progress=self.progress.emit)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.classified.emit(timeline)
+
+class PredictionWorker(QThread):
+    # Single long-lived inference thread. Each view holds at most one pending request: submitting a
+    # newer one replaces the older request if it has not started yet, so rapid clicks never queue up.
+    predicted = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.condition = threading.Condition()
+        self.pending = {}  # view -> (request_id, job)
+        self.stopping = False
+
+    def submit(self, view, request_id, job):
+        with self.condition:
+            self.pending[view] = (request_id, job)
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.pending.clear()
+            self.condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                view = next(iter(self.pending))
+                request_id, job = self.pending.pop(view)
+            try:
+                result = job()
+            except Exception as e:
+                self.failed.emit(request_id, str(e))
+            else:
+                self.predicted.emit(request_id, result)
 
 class MainWindow(QMainWindow):
-    def __init__(self, username=None):
+    def __init__(self, username=None, preloaded=None):
         super().__init__()
         self.username = username  # stores username
         self.initUI()
@@ -25,14 +204,27 @@ class MainWindow(QMainWindow):
 
         # Variables for the model and file paths
         self.model = None
+        self.predictor = None  # Warmed-up inference path for self.model
+        self.bulk_predictor = None  # Uncached predictor for tiles, folders, video and watch mode, whose inputs are rarely seen twice
         self.train_data_dir = None
         self.num_images = 0  # Store the number of images used for training
         self.current_image = None  # Store the current image for manipulation
         self.dark_mode = False  # Track dark mode state
         self.class_labels = []  # Store class labels
+        self.training_worker = None  # Background training thread
+        self.classify_worker = None  # Background folder classification thread
+        self.watch_worker = None  # Background watch-folder thread
+        self.video_worker = None  # Background video classification thread
+        self.watch_count = 0  # Images classified since watching started
+        self.prediction_id = 0  # Id of the latest prediction request; older results are stale
+        self.prediction_worker = PredictionWorker(self)
+        self.prediction_handler = None  # Renders the result of the latest prediction request
+        self.prediction_worker.predicted.connect(self.predictionReady)
+        self.prediction_worker.failed.connect(self.predictionFailed)
+        self.prediction_worker.start()
 
         # Load pre-trained model and class labels if they exist
-        self.loadPreTrainedModel()
+        self.loadPreTrainedModel(preloaded)
 
     def initUI(self):
         screen = QGuiApplication.primaryScreen().availableGeometry()
@@ -186,6 +378,45 @@ class MainWindow(QMainWindow):
         about_us_action = self.menu.addAction("About Us (हाम्रो बारेमा)")
         about_us_action.triggered.connect(self.openAboutUs)
 
+        # Add "Update Model" action to the menu
+        update_model_action = self.menu.addAction("Update Model (मोडेल अपडेट गर्नुहोस्)")
+        update_model_action.triggered.connect(lambda: self.selectRetrainFolder('update'))
+
+        # Add "Retrain Classifier Only" action to the menu
+        retrain_head_action = self.menu.addAction("Retrain Classifier Only (वर्गीकरणकर्ता मात्र पुनः प्रशिक्षण गर्नुहोस्)")
+        retrain_head_action.triggered.connect(lambda: self.selectRetrainFolder('head'))
+
+        # Add "Classify Folder" action to the menu
+        classify_folder_action = self.menu.addAction("Classify Folder (फोल्डर वर्गीकरण गर्नुहोस्)")
+        classify_folder_action.triggered.connect(self.classifyFolder)
+
+        # Add "Classify Video" option to the menu
+        classify_video_action = self.menu.addAction("Classify Video (भिडियो वर्गीकरण गर्नुहोस्)")
+        classify_video_action.triggered.connect(self.classifyVideo)
+
+        # Add "Watch Folder" option to the menu
+        self.watch_folder_action = self.menu.addAction("Watch Folder (फोल्डर निगरानी गर्नुहोस्)")
+        self.watch_folder_action.setCheckable(True)
+        self.watch_folder_action.toggled.connect(self.toggleWatchFolder)
+
+        # Add "Balance Classes" option to the menu
+        self.balance_classes_action = self.menu.addAction("Balance Classes (वर्गहरू सन्तुलित गर्नुहोस्)")
+        self.balance_classes_action.setCheckable(True)
+
+        # Add "Use Lightweight Model" option to the menu
+        self.lightweight_model_action = self.menu.addAction("Use Lightweight Model (हल्का मोडेल प्रयोग गर्नुहोस्)")
+        self.lightweight_model_action.setCheckable(True)
+        self.lightweight_model_action.toggled.connect(lambda: self.setModel(self.model))
+
+        # Add "Test-Time Augmentation" option to the menu
+        self.tta_action = self.menu.addAction("Test-Time Augmentation (परीक्षण-समय वृद्धि)")
+        self.tta_action.setCheckable(True)
+        self.tta_action.toggled.connect(lambda: self.setModel(self.model))
+
+        # Add "Tiled Field Scan" option to the menu
+        self.tiled_scan_action = self.menu.addAction("Tiled Field Scan (टाइल गरिएको क्षेत्र स्क्यान)")
+        self.tiled_scan_action.setCheckable(True)
+
         # Add the menu to the button
         self.menu_button.setMenu(self.menu)
 
@@ -607,61 +838,180 @@ class MainWindow(QMainWindow):
             self.train_data_dir = folder_path
             self.trainModel(folder_path)
 
-    def trainModel(self, folder_path):
+    def selectRetrainFolder(self, mode):
+        folder_path = QFileDialog.getExistingDirectory(self, 'Select Training Folder (प्रशिक्षण फोल्डर छान्नुहोस्)', self.train_data_dir or '')
+        if folder_path:
+            self.train_data_dir = folder_path
+            self.trainModel(folder_path, mode)
+
+    def trainModel(self, folder_path, mode='full'):
+        if self.training_worker is not None and self.training_worker.isRunning():
+            QMessageBox.information(self, "Training (प्रशिक्षण)", "Training is already running. (प्रशिक्षण पहिले नै चलिरहेको छ।)")
+            return
+
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("Preparing images... (तस्वीरहरू तयार गर्दै...)")
+        self.upload_train.setEnabled(False)
+        self.upload_pre_trained.setEnabled(False)
+
+        # Class balancing only applies to full training runs
+        options = {'balance': self.balance_classes_action.isChecked()} if mode == 'full' else {}
+        self.training_worker = TrainingWorker(folder_path, mode, options, self)
+        self.training_worker.progress.connect(self.updateProgress)
+        self.training_worker.trained.connect(self.trainingFinished)
+        self.training_worker.failed.connect(self.trainingFailed)
+        self.training_worker.start()
+
+    def updateProgress(self, progress):
+        # Early stopping decides how many epochs run, so the bar tracks the current epoch
+        self.progress_bar.setValue(int(progress['batch'] * 100 / progress['steps']))
+        self.progress_bar.setFormat(f"%p% - {training.format_progress(progress)}")
+
+    def trainingFinished(self, result):
+        self.resetTrainingControls()
+        self.num_images = result['num_images']
+        if self.num_images == 0:
+            self.image_label.setText('No images found in the selected folder. (चयन गरिएको फोल्डरमा कुनै तस्वीर भेटिएन।)')
+            return
 
-        # Simulate smooth progress update
-        self.timer = QTimer()
-        self.timer.timeout.connect(lambda: self.updateProgress(1))  # Increment by 1% every 50ms
-        self.timer.start(50)
+        self.setModel(result['model'])
+        self.class_labels = result['class_labels']
+        if result.get('mode') == 'update':
+            self.image_label.setText(f"Model updated with {result['new_images']} new images ({self.num_images} total). (मोडेल {result['new_images']} नयाँ तस्वीरहरूसँग अपडेट गरियो।)")
+            return
+        self.image_label.setText(f'Model trained with {self.num_images} images! Now upload an image for prediction. (मोडेल {self.num_images} तस्वीरहरूसँग प्रशिक्षित गरियो! अब पूर्वानुमानका लागि तस्वीर अपलोड गर्नुहोस्।)')
 
-        datagen = ImageDataGenerator(rescale=1.0/255.0)
-        train_generator = datagen.flow_from_directory(
-            folder_path,
-            target_size=(150, 150),
-            batch_size=32,
-            class_mode='categorical'
-        )
+    def trainingFailed(self, message):
+        self.resetTrainingControls()
+        QMessageBox.critical(self, "Error (त्रुटि)", f"Training failed: {message}")
 
-        self.num_images = train_generator.samples
-        if self.num_images == 0:
-            self.image_label.setText('No images found in the selected folder. (चयन गरिएको फोल्डरमा कुनै तस्वीर भेटिएन।)')
-            self.progress_bar.setVisible(False)
+    def resetTrainingControls(self):
+        self.progress_bar.setVisible(False)
+        self.progress_bar.resetFormat()
+        self.upload_train.setEnabled(True)
+        self.upload_pre_trained.setEnabled(True)
+
+    def classifyFolder(self):
+        if self.model is None:
+            QMessageBox.warning(self, "No Model (मोडेल छैन)", "Train or load a model first. (पहिले मोडेल प्रशिक्षित वा लोड गर्नुहोस्।)")
+            return
+        if self.classify_worker is not None and self.classify_worker.isRunning():
+            return
+        folder_path = QFileDialog.getExistingDirectory(self, 'Select Folder to Classify (वर्गीकरण गर्न फोल्डर छान्नुहोस्)')
+        if not folder_path:
+            return
+        # Picking an existing results file resumes where the last run stopped
+        output_path, _ = QFileDialog.getSaveFileName(self, 'Save Results As (नतिजा बचत गर्नुहोस्)', 'results.csv',
+                                                     'CSV (*.csv);;JSON Lines (*.jsonl)',
+                                                     options=QFileDialog.DontConfirmOverwrite)
+        if not output_path:
             return
 
-        print(f"Total images used for training: {self.num_images}")
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+        self.classify_worker = ClassifyFolderWorker(folder_path, output_path, self.bulk_predictor, self.class_labels, self)
+        self.classify_worker.progress.connect(self.updateClassifyProgress)
+        self.classify_worker.classified.connect(self.classifyFinished)
+        self.classify_worker.failed.connect(self.classifyFailed)
+        self.classify_worker.start()
 
-        self.model = tf.keras.Sequential([
-            tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(150, 150, 3)),
-            tf.keras.layers.MaxPooling2D(2, 2),
-            tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
-            tf.keras.layers.MaxPooling2D(2, 2),
-            tf.keras.layers.Flatten(),
-            tf.keras.layers.Dense(128, activation='relu'),
-            tf.keras.layers.Dense(train_generator.num_classes, activation='softmax')
-        ])
+    def updateClassifyProgress(self, done, total):
+        self.progress_bar.setValue(int(done * 100 / total) if total else 100)
+        self.progress_bar.setFormat(f"%p% - {done}/{total} images classified")
 
-        self.model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
-        history = self.model.fit(train_generator, epochs=5)
+    def classifyFinished(self, done, output_path):
+        self.progress_bar.setVisible(False)
+        self.progress_bar.resetFormat()
+        QMessageBox.information(self, "Success (सफलता)", f"Classified {done} images. Results saved to {output_path} (नतिजा बचत गरियो)")
 
-        self.timer.stop()
+    def classifyFailed(self, message):
         self.progress_bar.setVisible(False)
+        self.progress_bar.resetFormat()
+        QMessageBox.critical(self, "Error (त्रुटि)", f"Folder classification failed: {message}")
 
-        for epoch in range(5):
-            print(f"Epoch {epoch+1}: Loss = {history.history['loss'][epoch]:.4f}, Accuracy = {history.history['accuracy'][epoch]*100:.2f}%")
+    def classifyVideo(self):
+        if self.model is None:
+            QMessageBox.warning(self, "No Model (मोडेल छैन)", "Train or load a model first. (पहिले मोडेल प्रशिक्षित वा लोड गर्नुहोस्।)")
+            return
+        if self.video_worker is not None and self.video_worker.isRunning():
+            return
+        video_path, _ = QFileDialog.getOpenFileName(self, 'Select Video (भिडियो छान्नुहोस्)', '', 'Videos (*.mp4 *.avi *.mov *.mkv)')
+        if not video_path:
+            return
 
-        self.model.save('trained_model.h5')
-        self.class_labels = list(os.listdir(folder_path))
-        with open('class_labels.pkl', 'wb') as f:
-            pickle.dump(self.class_labels, f)
-        self.image_label.setText(f'Model trained with {self.num_images} images! Now upload an image for prediction. (मोडेल {self.num_images} तस्वीरहरूसँग प्रशिक्षित गरियो! अब पूर्वानुमानका लागि तस्वीर अपलोड गर्नुहोस्।)')
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+        self.video_worker = VideoWorker(video_path, self.bulk_predictor, self.class_labels, self)
+        self.video_worker.progress.connect(self.updateVideoProgress)
+        self.video_worker.classified.connect(self.videoFinished)
+        self.video_worker.failed.connect(self.videoFailed)
+        self.video_worker.start()
+
+    def updateVideoProgress(self, seconds, duration):
+        self.progress_bar.setValue(int(seconds * 100 / duration) if duration else 0)
+        self.progress_bar.setFormat(f"%p% - {video_classify.format_time(seconds)} of video classified")
+
+    def videoFinished(self, timeline):
+        self.progress_bar.setVisible(False)
+        self.progress_bar.resetFormat()
+        result_text = '<b>Video Timeline (भिडियो समयरेखा):</b><br>'
+        for segment in timeline:
+            result_text += (f"{video_classify.format_time(segment['start'])} - {video_classify.format_time(segment['end'])}: "
+                            f"{segment['label']} ({segment['confidence'] * 100:.2f}% confidence)<br>")
+        self.predictions_label.setText(result_text)
+        self.invasive_species_label.setVisible(any(segment['label'] == "Invasive Species" for segment in timeline))
 
-    def updateProgress(self, value):
-        if self.progress_bar.value() < 100:
-            self.progress_bar.setValue(self.progress_bar.value() + value)
+    def videoFailed(self, message):
+        self.progress_bar.setVisible(False)
+        self.progress_bar.resetFormat()
+        QMessageBox.critical(self, "Error (त्रुटि)", f"Video classification failed: {message}")
+
+    def toggleWatchFolder(self, checked):
+        if not checked:
+            if self.watch_worker is not None:
+                self.watch_worker.stop()
+            return
+        if self.model is None:
+            QMessageBox.warning(self, "No Model (मोडेल छैन)", "Train or load a model first. (पहिले मोडेल प्रशिक्षित वा लोड गर्नुहोस्।)")
+            self.watch_folder_action.setChecked(False)
+            return
+        folder_path = QFileDialog.getExistingDirectory(self, 'Select Folder to Watch (निगरानी गर्न फोल्डर छान्नुहोस्)')
+        log_path = ''
+        if folder_path:
+            # Choosing an existing log skips every image it already lists
+            log_path, _ = QFileDialog.getSaveFileName(self, 'Save Log As (लग बचत गर्नुहोस्)', watch_folder.WATCH_LOG_PATH,
+                                                      'CSV (*.csv);;JSON Lines (*.jsonl)',
+                                                      options=QFileDialog.DontConfirmOverwrite)
+        if not log_path:
+            self.watch_folder_action.setChecked(False)
+            return
+
+        self.watch_count = 0
+        self.watch_worker = WatchFolderWorker(folder_path, log_path, self.bulk_predictor, self.class_labels, self)
+        self.watch_worker.classified.connect(self.watchResults)
+        self.watch_worker.failed.connect(self.watchFailed)
+        self.watch_worker.start()
+        self.predictions_label.setText(f"<b>Watching (निगरानी):</b> {folder_path}<br>New images will be classified as they arrive.")
+
+    def watchResults(self, results):
+        self.watch_count += len(results)
+        invasive = [result for result in results if result['label'] == "Invasive Species"]
+        latest = invasive[-1] if invasive else results[-1]
+        result_text = f'<b>Watching (निगरानी):</b> {self.watch_count} images classified<br>'
+        if latest['label'] is None:
+            result_text += f"Latest: {os.path.basename(latest['path'])} could not be read"
         else:
-            self.timer.stop()
+            result_text += f"Latest: {os.path.basename(latest['path'])} - {latest['label']} ({latest['confidence'] * 100:.2f}% confidence)"
+        self.predictions_label.setText(result_text)
+        if invasive:
+            self.invasive_species_label.setVisible(True)
+
+    def watchFailed(self, message):
+        self.watch_folder_action.blockSignals(True)
+        self.watch_folder_action.setChecked(False)
+        self.watch_folder_action.blockSignals(False)
+        QMessageBox.critical(self, "Error (त्रुटि)", f"Watching the folder failed: {message}")
 
     def uploadTestImage(self):
         image_path, _ = QFileDialog.getOpenFileName(self, 'Select Image for Prediction (पूर्वानुमानका लागि तस्वीर छान्नुहोस्)', '', 'Images (*.png *.jpg *.bmp)')
@@ -693,6 +1043,7 @@ class MainWindow(QMainWindow):
             self.displayImage(self.current_image)
 
     def clearImage(self):
+        self.cancelPredictions()
         self.current_image = None
         self.image_label.setText("Your selected image will appear here. (तपाईंले छान्नुभएको तस्वीर यहाँ देखिनेछ।)")
         self.predictions_label.setText("Model's Predictions (मोडेलको पूर्वानुमानहरू)")
@@ -706,22 +1057,80 @@ class MainWindow(QMainWindow):
                 QMessageBox.information(self, "Success (सफलता)", "Image saved successfully! (तस्वीर सफलतापूर्वक बचत गरियो!)")
 
     def predictImage(self, image_path):
-        img = load_img(image_path, target_size=(150, 150))
-        img_array = img_to_array(img)
+        if self.tiled_scan_action.isChecked():
+            self.predictTiles(lambda: (tiled_inference.load_rgb(image_path), None))
+            return
+
+        def job():
+            img = tf.keras.preprocessing.image.load_img(image_path, target_size=datasets.IMG_SIZE)
+            return self.runPrediction(predictor, tf.keras.preprocessing.image.img_to_array(img))
+
+        predictor = self.predictor
+        self.requestPrediction(job)
+
+    def predictCurrentImage(self):
+        if self.current_image:
+            # Read the rotated/mirrored pixels straight from memory; no temporary file or JPEG round trip.
+            # QImage is implicitly shared, so the worker keeps this version even if the user rotates again.
+            image = QImage(self.current_image)
+            if self.tiled_scan_action.isChecked():
+                self.predictTiles(lambda: qimage_to_array(image))
+                return
+
+            def job():
+                pixels, owner = qimage_to_array(image)
+                return self.runPrediction(predictor, datasets.resize_nearest(pixels).astype(np.float32))
+
+            predictor = self.predictor
+            self.requestPrediction(job)
+
+    def predictTiles(self, load_pixels):
+        # Scans the full-resolution photo in overlapping tiles instead of squashing it to 150x150
+        def job():
+            # load_pixels returns the RGB array and whatever owns its buffer, kept alive while tiling
+            pixels, owner = load_pixels()
+            return tiled_inference.tiled_predict(pixels, predictor)
+
+        predictor = self.bulk_predictor
+        image = self.current_image
+        self.requestPrediction(job, lambda result: self.showTiledPredictions(result, image))
+
+    def requestPrediction(self, job, handler=None):
+        # Decoding and inference run on the prediction worker; only the newest request's result is shown
+        self.prediction_id += 1
+        self.prediction_handler = handler or self.showPredictions
+        if self.predictor is None:
+            self.predictions_label.setText("Train or load a model first. (पहिले मोडेल प्रशिक्षित वा लोड गर्नुहोस्।)")
+            return
+        self.predictions_label.setText("Predicting... (पूर्वानुमान गर्दै...)")
+        self.prediction_worker.submit('main', self.prediction_id, job)
+
+    def cancelPredictions(self):
+        # Any result still in flight belongs to an image or model that is gone
+        self.prediction_id += 1
+
+    @staticmethod
+    def runPrediction(predictor, img_array):
         img_array = np.expand_dims(img_array, axis=0) / 255.0
+        return predictor.predict(img_array)[0]
+
+    def predictionReady(self, request_id, result):
+        if request_id != self.prediction_id:
+            return  # Superseded by a newer request
+        self.prediction_handler(result)
 
-        predictions = self.model.predict(img_array)
-        predicted_class = np.argmax(predictions[0])
+    def showPredictions(self, predictions):
+        predicted_class = np.argmax(predictions)
 
         predicted_label = self.class_labels[predicted_class]
-        confidence = predictions[0][predicted_class] * 100
+        confidence = predictions[predicted_class] * 100
 
         result_text = f'<b>Prediction (पूर्वानुमान):</b> {predicted_label} ({confidence:.2f}% confidence)<br>'
         #result_text += f'<b>Trained with (प्रशिक्षित गरिएको):</b> {self.num_images} images.<br><br>'
         result_text += '<b>Probabilities (सम्भाव्यताहरू):</b><br>'
 
         for i, label in enumerate(self.class_labels):
-            probability = predictions[0][i] * 100
+            probability = predictions[i] * 100
             result_text += f'{label}: {probability:.2f}%<br>'
 
         self.predictions_label.setText(result_text)
@@ -732,17 +1141,40 @@ class MainWindow(QMainWindow):
         else:
             self.invasive_species_label.setVisible(False)
 
-    def predictCurrentImage(self):
-        if self.current_image:
-            # Save the current image temporarily
-            temp_image_path = "temp_image.jpg"
-            self.current_image.save(temp_image_path)
+    def showTiledPredictions(self, result, image):
+        summary = tiled_inference.verdict(result, self.class_labels)
+        result_text = f'<b>Field Scan (क्षेत्र स्क्यान):</b> {summary["label"]} ({summary["confidence"] * 100:.2f}% confidence)<br>'
+        result_text += f'{summary["tiles"]} tiles scanned'
+        if tiled_inference.TARGET_LABEL in self.class_labels:
+            result_text += f', {summary["hits"]} flagged as {tiled_inference.TARGET_LABEL}'
+            heat_class = self.class_labels.index(tiled_inference.TARGET_LABEL)
+        else:
+            heat_class = self.class_labels.index(summary['label'])
+        self.predictions_label.setText(result_text)
+        self.invasive_species_label.setVisible(summary['label'] == "Invasive Species")
+
+        # Skip the overlay if the photo was rotated, mirrored or replaced while the scan ran
+        if image is not None and image is self.current_image:
+            self.displayHeatmap(image, tiled_inference.heatmap(result, heat_class))
+
+    def displayHeatmap(self, image, heat):
+        # Red overlay whose opacity follows the tile probabilities, stretched smoothly over the photo
+        overlay = np.zeros(heat.shape + (4,), np.uint8)
+        overlay[..., 0] = 255
+        overlay[..., 3] = (heat * 160).astype(np.uint8)
+        heat_image = QImage(overlay.data, heat.shape[1], heat.shape[0], heat.shape[1] * 4, QImage.Format_RGBA8888).copy()
 
-            # Predict the temporary image
-            self.predictImage(temp_image_path)
+        pixmap = QPixmap.fromImage(image)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.drawImage(pixmap.rect(), heat_image)
+        painter.end()
+        self.image_label.setPixmap(pixmap.scaled(self.image_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
 
-            # Delete the temporary image
-            os.remove(temp_image_path)
+    def predictionFailed(self, request_id, message):
+        if request_id != self.prediction_id:
+            return
+        self.predictions_label.setText(f"Prediction failed: {message} (पूर्वानुमान असफल भयो)")
 
     def showHelp(self):
         help_text = """
@@ -754,6 +1186,11 @@ class MainWindow(QMainWindow):
         <p><b>5. Clear Image (तस्वीर खाली गर्नुहोस्):</b> Reset the displayed image.</p>
         <p><b>6. Save Image (तस्वीर बचत गर्नुहोस्):</b> Save the manipulated image to your computer.</p>
         <p><b>7. Progress Bar (प्रगति बार):</b> Shows the progress of model training.</p>
+        <p><b>8. Update Model (मोडेल अपडेट गर्नुहोस्):</b> From the ☰ menu, quickly fine-tune the saved model on newly added images.</p>
+        <p><b>9. Retrain Classifier Only (वर्गीकरणकर्ता मात्र पुनः प्रशिक्षण गर्नुहोस्):</b> From the ☰ menu, retrain only the final layers using cached image features.</p>
+        <p><b>10. Tiled Field Scan (टाइल गरिएको क्षेत्र स्क्यान):</b> From the ☰ menu, scan large field or drone photos in overlapping tiles and highlight where invasive plants were found.</p>
+        <p><b>11. Watch Folder (फोल्डर निगरानी गर्नुहोस्):</b> From the ☰ menu, classify new photos automatically as they are saved into a folder.</p>
+        <p><b>12. Classify Video (भिडियो वर्गीकरण गर्नुहोस्):</b> From the ☰ menu, sample frames from a video and see which label each part of it gets.</p>
         """
         QMessageBox.information(self, "Help (मद्दत)", help_text)
 
@@ -769,19 +1206,69 @@ class MainWindow(QMainWindow):
             os.remove('trained_model.h5')
         if os.path.exists('class_labels.pkl'):
             os.remove('class_labels.pkl')
-        self.model = None
+        if os.path.exists(training.TRAINED_FILES_PATH):
+            os.remove(training.TRAINED_FILES_PATH)
+        for tflite_file in inference.TFLITE_BACKENDS.values():
+            if os.path.exists(tflite_file):
+                os.remove(tflite_file)
+        self.setModel(None)
         self.class_labels = []
         self.image_label.setText("Model deleted. Upload new training images to train a new model. (मोडेल मेटाइयो। नयाँ प्रशिक्षण तस्वीरहरू अपलोड गरेर नयाँ मोडेल प्रशिक्षित गर्नुहोस्।)")
         self.predictions_label.setText("Model's Predictions (मोडेलको पूर्वानुमानहरू)")
         QMessageBox.information(self, "Success (सफलता)", "Model and associated files deleted successfully! (मोडेल र सम्बन्धित फाइलहरू सफलतापूर्वक मेटाइयो!)")
 
-    def loadPreTrainedModel(self):
-        if os.path.exists('trained_model.h5') and os.path.exists('class_labels.pkl'):
-            self.model = tf.keras.models.load_model('trained_model.h5')
-            with open('class_labels.pkl', 'rb') as f:
-                self.class_labels = pickle.load(f)
+    def setModel(self, model, keras_predictor=None):
+        # keras_predictor: a Predictor already traced for this model, e.g. by preload_model
+        self.cancelPredictions()
+        self.model = model
+        self.predictor = None
+        self.bulk_predictor = None
+        if model is None:
+            return
+        # The int8 TFLite model is used when requested and exported from the current trained_model.h5
+        backend = 'keras'
+        if self.lightweight_model_action.isChecked() and inference.tflite_path('tflite-int8'):
+            backend = 'tflite-int8'
+        elif self.lightweight_model_action.isChecked():
+            print("No up-to-date TFLite export found; using the Keras model")
+        # Tracing happens here, at load time, instead of on the first prediction
+        if backend == 'keras' and keras_predictor is not None:
+            predictor = keras_predictor
+        else:
+            predictor = inference.load_predictor(model, backend)
+        self.bulk_predictor = predictor
+        # Re-predicting the same photo is answered from the cache until trained_model.h5 changes
+        self.predictor = inference.CachedPredictor(predictor, inference.model_version(backend),
+                                                   cache_dir=inference.PREDICTION_CACHE_DIR)
+        if self.tta_action.isChecked():
+            # Averages over the rotations and mirror in one batch; each variant is still cached on its own
+            self.predictor = inference.TTAPredictor(self.predictor)
+
+    def loadPreTrainedModel(self, preloaded=None):
+        # preloaded: the result of preload_model() if it already ran in the background
+        if preloaded is None and os.path.exists('trained_model.h5') and os.path.exists('class_labels.pkl'):
+            preloaded = preload_model()
+        if preloaded is not None:
+            self.setModel(preloaded['model'], preloaded['predictor'])
+            self.class_labels = preloaded['class_labels']
             self.image_label.setText('Pre-trained model loaded. Now upload an image for prediction. (पूर्व-प्रशिक्षित मोडेल लोड गरियो। अब पूर्वानुमानका लागि तस्वीर अपलोड गर्नुहोस्।)')
 
+    def closeEvent(self, event):
+        # Training, folder and video jobs cannot be interrupted, and Qt aborts if a running QThread is destroyed
+        busy = [worker for worker in (self.training_worker, self.classify_worker, self.video_worker)
+                if worker is not None and worker.isRunning()]
+        if busy:
+            QMessageBox.information(self, "Please Wait (कृपया पर्खनुहोस्)",
+                                    "A training or classification job is still running. Close the app once it finishes. "
+                                    "(प्रशिक्षण वा वर्गीकरण कार्य अझै चलिरहेको छ। यो सकिएपछि एप बन्द गर्नुहोस्।)")
+            event.ignore()
+            return
+        self.prediction_worker.stop()
+        if self.watch_worker is not None:
+            self.watch_worker.stop()
+            self.watch_worker.wait()
+        super().closeEvent(event)
+
     def openAboutUs(self):
         # Open the "aboutus.py" file
         try:
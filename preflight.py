@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from dataset_cache import file_signature
+
+# Pre-flight scan: every training image must fully decode before model.fit starts
+SCAN_MANIFEST_PATH = 'scan_manifest.json'
+QUARANTINE_DIR = 'quarantine'
+# Bumped when verify_image changes what it accepts, so cached verdicts from older rules are re-checked
+SCAN_VERSION = 2
+
+
+def verify_image(path):
+    # Only a failed decode rejects a file. There is no format whitelist: training decodes with PIL
+    # (load_img), and list_image_files already limits the extensions, so e.g. multi-picture JPEGs
+    # that Pillow reports as 'MPO' are accepted like any other JPEG.
+    result = file_signature(path)
+    result['version'] = SCAN_VERSION
+    try:
+        with Image.open(path) as img:
+            result.update(format=img.format, width=img.width, height=img.height)
+            # load() decodes every pixel, which is what catches truncated files
+            img.load()
+        result['ok'] = True
+    except Exception as e:
+        result.update(ok=False, error=str(e))
+    return result
+
+
+def load_manifest(path=SCAN_MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path=SCAN_MANIFEST_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def scan(paths, manifest_path=SCAN_MANIFEST_PATH):
+    # Returns {absolute path: result}; unchanged files are answered from the cached manifest
+    manifest = load_manifest(manifest_path)
+    paths = [os.path.abspath(path) for path in paths]
+    results = {}
+    to_verify = []
+    for path in paths:
+        cached = manifest.get(path)
+        signature = file_signature(path)
+        if (cached is not None and cached.get('version') == SCAN_VERSION
+                and cached['size'] == signature['size'] and cached['mtime'] == signature['mtime']):
+            results[path] = cached
+        else:
+            to_verify.append(path)
+
+    if to_verify:
+        print(f"Pre-flight: verifying {len(to_verify)} of {len(paths)} images")
+        # Pillow releases the GIL while decoding, so threads keep every core busy
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            for path, result in zip(to_verify, pool.map(verify_image, to_verify)):
+                results[path] = result
+                manifest[path] = result
+        save_manifest(manifest, manifest_path)
+    return results
+
+
+def quarantine(path, folder_path):
+    # Moves a bad file out of the training folder, keeping its class sub-folder in the name
+    relative = os.path.relpath(path, folder_path)
+    destination = os.path.join(QUARANTINE_DIR, os.path.basename(os.path.abspath(folder_path)), relative)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    shutil.move(path, destination)
+    return destination
+
+
+def preflight(folder_path, paths, labels, move_bad=True):
+    # Returns the paths and labels that decode cleanly plus a list of the rejected files
+    results = scan(paths)
+    good_paths, good_labels, rejected = [], [], []
+    for path, label in zip(paths, labels):
+        result = results[os.path.abspath(path)]
+        if result['ok']:
+            good_paths.append(path)
+            good_labels.append(label)
+            continue
+        entry = {'path': path, 'error': result['error']}
+        if move_bad:
+            entry['quarantined_to'] = quarantine(path, folder_path)
+        rejected.append(entry)
+
+    if rejected:
+        action = f"moved to {QUARANTINE_DIR}" if move_bad else "skipped"
+        print(f"Pre-flight: {len(rejected)} unreadable images {action}")
+        for entry in rejected:
+            print(f"  {entry['path']}: {entry['error']}")
+    return good_paths, good_labels, rejected
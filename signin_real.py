@@ -5,15 +5,36 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QHBoxLayout,
                             QSizePolicy, QMessageBox)
 from PyQt5.QtGui import QFont
 from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, QTimer
 import os
 import main_real  # Import main_real instead of calculator
 
+class PrewarmWorker(QThread):
+    # Loads TensorFlow and the saved model while the user is still typing their credentials
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.result = None
+        self.ok = False
+
+    def run(self):
+        try:
+            self.result = main_real.preload_model()
+        except Exception as e:
+            # Submit falls back to building the main window the slow way, which reports the error
+            print(f"Pre-warming the main window failed: {e}")
+            return
+        self.ok = True
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.initUI()
         self.main_real_window = None  # Renamed for clarity
+        self.prewarmed_window = None  # main_real window built ahead of Submit
+        self.prewarm_worker = PrewarmWorker(self)
+        self.prewarm_worker.finished.connect(self.build_main_window)
+        # Starts once the event loop runs, i.e. after the login screen has been painted
+        QTimer.singleShot(0, self.prewarm_worker.start)
         self.setWindowTitle ("AGRINOVA APP - Login page")
         self.setWindowIcon(QIcon("favicon.png"))
 
@@ -131,6 +152,24 @@ class MainWindow(QMainWindow):
         container.setLayout(main_layout)
         self.setCentralWidget(container)
 
+    def build_main_window(self):
+        # Widgets can only be created on the GUI thread, so this last step runs here. The window stays
+        # hidden until Submit.
+        if self.prewarmed_window is not None or not self.prewarm_worker.ok:
+            return
+        try:
+            self.prewarmed_window = main_real.MainWindow(preloaded=self.prewarm_worker.result)
+        except Exception as e:
+            print(f"Pre-building the main window failed: {e}")
+
+    def closeEvent(self, event):
+        # Closed without signing in: no QThread may still be running when Qt tears down
+        self.prewarm_worker.finished.disconnect(self.build_main_window)
+        self.prewarm_worker.wait()
+        if self.prewarmed_window is not None and self.prewarmed_window is not self.main_real_window:
+            self.prewarmed_window.prediction_worker.stop()
+        super().closeEvent(event)
+
     def save_credentials(self):
         try:
             username = self.username_input.text()
@@ -150,7 +189,13 @@ class MainWindow(QMainWindow):
                 
                 # Open main_real.py window
                 try:
-                    self.main_real_window = main_real.MainWindow()  # Changed to reference main_real
+                    # Normally built while the user was typing; if Submit came first, wait for that work
+                    # rather than repeating it
+                    self.prewarm_worker.wait()
+                    self.build_main_window()
+                    self.main_real_window = self.prewarmed_window
+                    if self.main_real_window is None:
+                        self.main_real_window = main_real.MainWindow()  # Changed to reference main_real
                     self.main_real_window.show()
                     self.hide()  # Hide the login window
                 except Exception as e:
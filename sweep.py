@@ -0,0 +1,114 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cpu_profile
+
+# Each configuration trains in its own process with a pinned TensorFlow thread count
+DEFAULT_CONFIGS = [
+    {'filters': [32, 64], 'dense_units': 128, 'learning_rate': 0.001, 'batch_size': 32, 'epochs': 5},
+    {'filters': [16, 32], 'dense_units': 128, 'learning_rate': 0.001, 'batch_size': 32, 'epochs': 5},
+    {'filters': [16, 32], 'dense_units': 64, 'learning_rate': 0.001, 'batch_size': 32, 'epochs': 5},
+    {'filters': [32, 64], 'dense_units': 64, 'learning_rate': 0.001, 'batch_size': 64, 'epochs': 5},
+    {'filters': [32, 64], 'dense_units': 128, 'learning_rate': 0.0005, 'batch_size': 32, 'epochs': 8},
+    {'filters': [8, 16], 'dense_units': 32, 'learning_rate': 0.002, 'batch_size': 64, 'epochs': 5},
+]
+LATENCY_RUNS = 20
+
+
+def load_configs(path=None):
+    if path is None:
+        return DEFAULT_CONFIGS
+    with open(path) as f:
+        return json.load(f)
+
+
+def init_worker(threads):
+    # Runs in each fresh worker process before TensorFlow is imported there
+    cpu_profile.apply_profile(dict(cpu_profile.load_profile(), intra_op_threads=threads, inter_op_threads=1))
+
+
+def run_config(config, cache_dir, train_indices, validation_indices, num_classes):
+    import numpy as np
+    from dataset_cache import DatasetCache
+    from datasets import make_array_dataset
+    from training import build_model
+
+    # Every worker maps the same decoded-image cache; the OS shares its pages between processes
+    images, labels, _, _ = DatasetCache(cache_dir).open()
+    model = build_model(num_classes, config['filters'], config['dense_units'], config['learning_rate'])
+    train_dataset = make_array_dataset(images, labels, num_classes, config['batch_size'], indices=train_indices)
+
+    start = time.perf_counter()
+    model.fit(train_dataset, epochs=config['epochs'], verbose=0)
+    train_time = time.perf_counter() - start
+
+    accuracy = None
+    if validation_indices:
+        validation_dataset = make_array_dataset(images, labels, num_classes, config['batch_size'],
+                                                shuffle=False, indices=validation_indices)
+        accuracy = model.evaluate(validation_dataset, verbose=0)[1]
+
+    sample = images[:1].astype(np.float32) / 255.0
+    model(sample, training=False)
+    start = time.perf_counter()
+    for _ in range(LATENCY_RUNS):
+        model(sample, training=False)
+    latency_ms = (time.perf_counter() - start) / LATENCY_RUNS * 1000
+
+    return {'config': config, 'val_accuracy': accuracy, 'train_time': train_time,
+            'latency_ms': latency_ms, 'params': model.count_params()}
+
+
+def run_sweep(folder_path, configs=None, workers=None, min_accuracy=0.0):
+    from dataset_cache import CACHE_DIR, DatasetCache
+    from datasets import split_indices
+    from training import VALIDATION_SPLIT, collect_images
+
+    configs = configs or DEFAULT_CONFIGS
+    paths, labels, class_names = collect_images(folder_path)
+    if not paths:
+        print(f"No images found in {folder_path}")
+        return []
+    # Decode once up front so no worker has to
+    DatasetCache().sync(folder_path, paths, labels, class_names)
+    train_indices, validation_indices = split_indices(labels, VALIDATION_SPLIT)
+
+    cores = os.cpu_count() or 1
+    workers = workers or max(1, min(len(configs), cores // 2))
+    threads = max(1, cores // workers)
+    print(f"Sweeping {len(configs)} configurations on {workers} processes x {threads} threads")
+
+    # spawn: forking a parent that already loaded TensorFlow is unsafe
+    context = multiprocessing.get_context('spawn')
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(run_config, config, CACHE_DIR, train_indices, validation_indices, len(class_names))
+                   for config in configs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"Finished {describe(result['config'])}", flush=True)
+
+    print_table(results, min_accuracy)
+    return results
+
+
+def describe(config):
+    return (f"filters={'/'.join(str(f) for f in config['filters'])} dense={config['dense_units']} "
+            f"lr={config['learning_rate']} batch={config['batch_size']} epochs={config['epochs']}")
+
+
+def print_table(results, min_accuracy=0.0):
+    results = sorted(results, key=lambda result: result['latency_ms'])
+    # Fastest-to-run model that still meets the accuracy bar
+    best = next((result for result in results
+                 if result['val_accuracy'] is not None and result['val_accuracy'] >= min_accuracy), None)
+    print(f"{'configuration':<58} {'val acc':>8} {'train s':>9} {'latency ms':>11} {'params':>10}")
+    for result in results:
+        accuracy = 'n/a' if result['val_accuracy'] is None else f"{result['val_accuracy'] * 100:.1f}%"
+        marker = ' <- fastest meeting the bar' if result is best else ''
+        print(f"{describe(result['config']):<58} {accuracy:>8} {result['train_time']:>9.1f} "
+              f"{result['latency_ms']:>11.2f} {result['params']:>10}{marker}")
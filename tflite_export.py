@@ -0,0 +1,77 @@
+import os
+import random
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from batch_classify import load_for_prediction
+from datasets import list_image_files
+from tflite_predictor import FP16_MODEL_PATH, INT8_MODEL_PATH
+
+REPRESENTATIVE_IMAGES = 200
+COMPARE_IMAGES = 500
+LATENCY_RUNS = 50
+
+
+def sample_images(folder_path, count, seed=0):
+    paths, labels, _ = list_image_files(folder_path)
+    picks = random.Random(seed).sample(range(len(paths)), min(count, len(paths)))
+    samples = []
+    for i in picks:
+        array, error = load_for_prediction(paths[i])
+        if error is None:
+            samples.append((array.astype(np.float32), labels[i]))
+    return samples
+
+
+def export_tflite(model, folder_path, out_dir='.'):
+    # Writes a float16 model and a fully int8 model calibrated on images drawn from the training folder
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    fp16_path = os.path.join(out_dir, FP16_MODEL_PATH)
+    with open(fp16_path, 'wb') as f:
+        f.write(converter.convert())
+
+    calibration = [image for image, _ in sample_images(folder_path, REPRESENTATIVE_IMAGES)]
+    if not calibration:
+        raise ValueError(f"No readable images in {folder_path} to calibrate the int8 model")
+
+    def representative_dataset():
+        for image in calibration:
+            yield [image[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.uint8
+    converter.inference_output_type = tf.uint8
+    int8_path = os.path.join(out_dir, INT8_MODEL_PATH)
+    with open(int8_path, 'wb') as f:
+        f.write(converter.convert())
+    return fp16_path, int8_path
+
+
+def compare_backends(predictors, folder_path, count=COMPARE_IMAGES):
+    # Accuracy on a labelled sample of the folder, agreement with the Keras model, size and single-image latency
+    samples = sample_images(folder_path, count, seed=1)
+    images = np.stack([image for image, _ in samples])
+    labels = np.array([label for _, label in samples])
+    reference = None
+    rows = []
+    for name, predictor, size in predictors:
+        predictions = np.concatenate([predictor.predict(images[i:i + 1]) for i in range(len(images))])
+        top1 = predictions.argmax(axis=1)
+        if reference is None:
+            reference = top1
+        latencies = []
+        for i in range(LATENCY_RUNS):
+            start = time.perf_counter()
+            predictor.predict(images[i % len(images)][np.newaxis])
+            latencies.append((time.perf_counter() - start) * 1000)
+        rows.append({'backend': name, 'accuracy': float((top1 == labels).mean()),
+                     'agreement': float((top1 == reference).mean()), 'latency_ms': float(np.median(latencies)),
+                     'size_mb': size / 1e6})
+    return rows
@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+
+# Prefer the standalone TFLite runtime, which is far lighter than full TensorFlow
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    Interpreter = None
+
+FP16_MODEL_PATH = 'trained_model_fp16.tflite'
+INT8_MODEL_PATH = 'trained_model_int8.tflite'
+
+
+class TFLitePredictor:
+    # Same interface as inference.Predictor: predict((N, 150, 150, 3) float32 in [0, 1]) -> (N, classes)
+    def __init__(self, model_path, num_threads=None):
+        interpreter_class = Interpreter
+        if interpreter_class is None:
+            import tensorflow as tf
+            interpreter_class = tf.lite.Interpreter
+        self.interpreter = interpreter_class(model_path=model_path, num_threads=num_threads)
+        # One interpreter is shared by the prediction and folder-classification threads but is not thread-safe
+        self.lock = threading.Lock()
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input['shape'][0])
+        self.predict(np.zeros((1,) + tuple(self.input['shape'][1:]), np.float32))
+
+    def resize(self, batch_size):
+        # Reallocation is expensive, so only done when the batch size actually changes
+        self.interpreter.resize_tensor_input(self.input['index'], [batch_size] + list(self.input['shape'][1:]))
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = batch_size
+
+    def predict(self, images):
+        with self.lock:
+            return self.invoke(np.asarray(images, np.float32))
+
+    def invoke(self, images):
+        if len(images) != self.batch_size:
+            self.resize(len(images))
+
+        # Fully integer models take quantized input and return quantized output
+        scale, zero_point = self.input['quantization']
+        if self.input['dtype'] != np.float32 and scale:
+            info = np.iinfo(self.input['dtype'])
+            images = np.clip(np.round(images / scale + zero_point), info.min, info.max).astype(self.input['dtype'])
+        self.interpreter.set_tensor(self.input['index'], images)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output['index'])
+
+        scale, zero_point = self.output['quantization']
+        if self.output['dtype'] != np.float32 and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
@@ -0,0 +1,85 @@
+from itertools import islice
+
+import numpy as np
+from PIL import Image
+
+from datasets import IMG_SIZE, resize_nearest
+
+# Sliding-window inference for large field and drone photos, where a plant covers only a small patch
+TILE_SIZE = IMG_SIZE[0]  # Pixels of the full-resolution photo per tile; tiles are resized to IMG_SIZE
+TILE_OVERLAP = 0.5
+TILE_BATCH_SIZE = 64
+TILE_THRESHOLD = 0.5  # A tile above this for the target class flags the whole image
+TARGET_LABEL = "Invasive Species"
+
+
+def tile_origins(length, tile_size, stride):
+    # Start offsets along one axis; the last tile is pulled back so it ends exactly at the edge
+    if length <= tile_size:
+        return [0]
+    origins = list(range(0, length - tile_size + 1, stride))
+    if origins[-1] != length - tile_size:
+        origins.append(length - tile_size)
+    return origins
+
+
+def load_rgb(path):
+    with Image.open(path) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+def iter_tiles(image, xs, ys, tile_size):
+    # Crops and resizes one tile at a time, so only a batch of tiles is ever held in memory
+    for y in ys:
+        for x in xs:
+            tile = image[y:y + tile_size, x:x + tile_size]
+            if tile.shape[:2] != IMG_SIZE:
+                tile = resize_nearest(tile)
+            yield tile
+
+
+def tiled_predict(image, predictor, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, batch_size=TILE_BATCH_SIZE):
+    # image: (height, width, 3) uint8 RGB at full resolution. Returns per-tile probabilities laid out
+    # as a (rows, columns, classes) grid together with the tile geometry needed to draw it.
+    height, width = image.shape[:2]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    xs = tile_origins(width, tile_size, stride)
+    ys = tile_origins(height, tile_size, stride)
+
+    tiles = iter_tiles(image, xs, ys, tile_size)
+    predictions = []
+    while True:
+        batch = list(islice(tiles, batch_size))
+        if not batch:
+            break
+        predictions.append(np.asarray(predictor.predict(np.stack(batch).astype(np.float32) / 255.0)))
+    grid = np.concatenate(predictions).reshape(len(ys), len(xs), -1)
+    return {'grid': grid, 'xs': xs, 'ys': ys, 'tile_size': tile_size, 'stride': stride,
+            'image_size': (height, width)}
+
+
+def verdict(result, class_labels, target_label=TARGET_LABEL, threshold=TILE_THRESHOLD):
+    # Image-level call: any confident target tile flags the image; otherwise the mean over tiles decides
+    probabilities = result['grid'].reshape(-1, len(class_labels))
+    mean = probabilities.mean(axis=0)
+    summary = {'label': class_labels[int(np.argmax(mean))], 'confidence': float(mean.max()),
+               'tiles': len(probabilities), 'hits': 0}
+    if target_label in class_labels:
+        target = class_labels.index(target_label)
+        summary['hits'] = int((probabilities[:, target] >= threshold).sum())
+        if summary['hits']:
+            summary.update(label=target_label, confidence=float(probabilities[:, target].max()))
+    return summary
+
+
+def heatmap(result, class_index):
+    # (height, width) / stride map holding, for each cell, the highest probability of any tile covering it
+    cell = result['stride']
+    tile_size = result['tile_size']
+    height, width = result['image_size']
+    heat = np.zeros((-(-height // cell), -(-width // cell)), np.float32)
+    for row, y in enumerate(result['ys']):
+        for col, x in enumerate(result['xs']):
+            block = heat[y // cell:-(-(y + tile_size) // cell), x // cell:-(-(x + tile_size) // cell)]
+            np.maximum(block, result['grid'][row, col, class_index], out=block)
+    return heat
@@ -0,0 +1,347 @@
+import json
+import os
+import pickle
+import random
+import shutil
+import time
+
+import tensorflow as tf
+
+from datasets import (IMG_SIZE, BATCH_SIZE, list_image_files, make_array_dataset, make_balanced_dataset, make_dataset,
+                      split_indices)
+from dataset_cache import DatasetCache, file_signature
+import dedupe
+import preflight
+from embedding_cache import EmbeddingCache, make_feature_dataset, split_model
+
+# Training settings shared by the GUI and any other entry point
+EPOCHS = 20  # Upper bound; early stopping usually ends the run sooner
+VALIDATION_SPLIT = 0.2
+EARLY_STOPPING_PATIENCE = 3
+MODEL_PATH = 'trained_model.h5'
+LABELS_PATH = 'class_labels.pkl'
+TRAINED_FILES_PATH = 'trained_files.json'
+CHECKPOINT_DIR = 'checkpoints'
+BEST_CHECKPOINT_PATH = os.path.join(CHECKPOINT_DIR, 'best_model.h5')
+BACKUP_DIR = os.path.join(CHECKPOINT_DIR, 'backup')
+RUN_INFO_PATH = os.path.join(CHECKPOINT_DIR, 'run.json')
+
+# Incremental updates fine-tune on new images plus a replay sample of old ones
+UPDATE_EPOCHS = 2
+HEAD_EPOCHS = 5
+UPDATE_LEARNING_RATE = 1e-4
+REPLAY_RATIO = 2
+REPLAY_MIN = 64
+
+
+def build_model(num_classes, filters=(32, 64), dense_units=128, learning_rate=0.001):
+    model = tf.keras.Sequential([
+        tf.keras.layers.Conv2D(filters[0], (3, 3), activation='relu', input_shape=IMG_SIZE + (3,)),
+        tf.keras.layers.MaxPooling2D(2, 2),
+        tf.keras.layers.Conv2D(filters[1], (3, 3), activation='relu'),
+        tf.keras.layers.MaxPooling2D(2, 2),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(dense_units, activation='relu'),
+        tf.keras.layers.Dense(num_classes, activation='softmax')
+    ])
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+                  loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+class ProgressCallback(tf.keras.callbacks.Callback):
+    # Reports real progress after every batch: position in the current epoch, images/sec, time left in the
+    # epoch, loss and accuracy. Early stopping makes the number of epochs unknown up front, so nothing is
+    # reported against the whole run.
+    def __init__(self, on_progress, num_images, batch_size):
+        super().__init__()
+        self.on_progress = on_progress
+        self.num_images = num_images
+        self.batch_size = batch_size
+
+    def on_train_begin(self, logs=None):
+        self.epochs = self.params.get('epochs') or 1
+        self.steps = self.params.get('steps') or -(-self.num_images // self.batch_size)
+        self.batches_done = 0
+        self.images_seen = 0
+        self.epoch = 0
+        self.start_time = time.perf_counter()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch
+
+    def on_train_batch_end(self, batch, logs=None):
+        logs = logs or {}
+        self.batches_done += 1
+        elapsed = time.perf_counter() - self.start_time
+        # Counted rather than derived from the epoch number, which starts past 0 when a run is resumed
+        self.images_seen += max(0, min(self.batch_size, self.num_images - batch * self.batch_size))
+        remaining = self.steps - (batch + 1)
+        self.on_progress({
+            'epoch': self.epoch + 1,
+            'epochs': self.epochs,
+            'batch': batch + 1,
+            'steps': self.steps,
+            'batches_done': self.batches_done,
+            'images_per_sec': self.images_seen / elapsed if elapsed > 0 else 0.0,
+            'eta': elapsed / self.batches_done * remaining,
+            'loss': logs.get('loss'),
+            'accuracy': logs.get('accuracy'),
+        })
+
+
+def format_progress(progress):
+    # One-line summary used by the progress bar and the console
+    eta = int(progress['eta'])
+    text = (f"Epoch {progress['epoch']} (up to {progress['epochs']}), batch {progress['batch']}/{progress['steps']}, "
+            f"{progress['images_per_sec']:.0f} img/s, epoch ETA {eta // 60}:{eta % 60:02d}")
+    if progress.get('loss') is not None:
+        text += f", loss {progress['loss']:.4f}"
+    if progress.get('accuracy') is not None:
+        text += f", acc {progress['accuracy'] * 100:.1f}%"
+    return text
+
+
+def collect_images(folder_path, remove_duplicates=True, quarantine_bad=True):
+    paths, labels, class_labels = list_image_files(folder_path)
+    if paths:
+        # A single truncated file would otherwise crash model.fit deep into a run
+        paths, labels, _ = preflight.preflight(folder_path, paths, labels, quarantine_bad)
+    if remove_duplicates and paths:
+        # Exact and near-duplicate photos only inflate epochs and bias classes
+        paths, labels, _ = dedupe.dedupe(paths, labels)
+    return paths, labels, class_labels
+
+
+class BestValueRecorder(tf.keras.callbacks.Callback):
+    # ModelCheckpoint forgets its best value between fit calls and BackupAndRestore does not bring it
+    # back, so it is kept in run.json and handed to the resumed run's ModelCheckpoint
+    def __init__(self, checkpoint, run_info):
+        super().__init__()
+        self.checkpoint = checkpoint
+        self.run_info = run_info
+        self.best = checkpoint.best
+
+    def on_epoch_end(self, epoch, logs=None):
+        # Runs after the checkpoint callback, so this is the value best_model.h5 was saved with
+        if self.checkpoint.best != self.best:
+            self.best = float(self.checkpoint.best)
+            write_run_info(dict(self.run_info, best=self.best))
+
+
+def write_run_info(run_info):
+    tmp_path = RUN_INFO_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(run_info, f)
+    os.replace(tmp_path, RUN_INFO_PATH)
+
+
+def prepare_checkpoints(run_info):
+    # An interrupted run is only resumed when it was training on the same images and classes.
+    # Returns the best monitored value the interrupted run reached, or None for a fresh run.
+    try:
+        with open(RUN_INFO_PATH) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+    best = previous.pop('best', None) if isinstance(previous, dict) else None
+    if previous != run_info:
+        shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+        best = None
+    elif os.path.isdir(BACKUP_DIR):
+        print("Resuming interrupted training run from the last checkpoint")
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    write_run_info(run_info if best is None else dict(run_info, best=best))
+    return best
+
+
+def train_model(folder_path, on_progress=None, use_cache=True, epochs=EPOCHS, batch_size=BATCH_SIZE, out_dir='.',
+                remove_duplicates=True, balance=False, class_ratios=None, steps_per_epoch=None):
+    # balance: draw batches from per-class streams (equal, or weighted by class_ratios {class name: weight})
+    # so minority classes are not drowned out; an epoch is then steps_per_epoch batches (default: one
+    # pass worth of batches).
+    paths, labels, class_labels = collect_images(folder_path, remove_duplicates)
+    num_images = len(paths)
+    if num_images == 0:
+        return {'num_images': 0, 'model': None, 'class_labels': []}
+
+    print(f"Found {num_images} images belonging to {len(class_labels)} classes.")
+    print(f"Total images used for training: {num_images}")
+
+    num_classes = len(class_labels)
+    train_indices, validation_indices = split_indices(labels, VALIDATION_SPLIT)
+    # Balanced sampling always reads from the dataset cache
+    if use_cache or balance:
+        # Decoded images are reused across runs; only new or changed files get decoded
+        images, cached_labels, _, _ = DatasetCache().sync(folder_path, paths, labels, class_labels)
+
+        def subset(indices, shuffle=True):
+            return make_array_dataset(images, cached_labels, num_classes, batch_size, shuffle=shuffle, indices=indices)
+    else:
+        def subset(indices, shuffle=True):
+            return make_dataset([paths[i] for i in indices], [labels[i] for i in indices], num_classes, batch_size, shuffle=shuffle)
+
+    epoch_images = len(train_indices)
+    if balance:
+        steps_per_epoch = steps_per_epoch or -(-len(train_indices) // batch_size)
+        epoch_images = steps_per_epoch * batch_size
+        unknown = sorted(set(class_ratios or {}) - set(class_labels))
+        if unknown:
+            raise ValueError(f"Unknown classes in class ratios: {', '.join(unknown)} (classes are {', '.join(class_labels)})")
+        ratios = [class_ratios.get(name, 1.0) for name in class_labels] if class_ratios else None
+        train_dataset = make_balanced_dataset(images, cached_labels, num_classes, batch_size, train_indices, ratios)
+        print(f"Class-balanced sampling, {steps_per_epoch} steps per epoch")
+    else:
+        steps_per_epoch = None
+        train_dataset = subset(train_indices)
+    validation_dataset = subset(validation_indices, shuffle=False) if validation_indices else None
+    monitor = 'val_loss' if validation_dataset is not None else 'loss'
+
+    run_info = {'folder': os.path.abspath(folder_path), 'class_labels': class_labels,
+                'num_images': num_images, 'validation_split': VALIDATION_SPLIT}
+    best = prepare_checkpoints(run_info)
+    model = build_model(num_classes)
+    checkpoint = tf.keras.callbacks.ModelCheckpoint(BEST_CHECKPOINT_PATH, monitor=monitor, save_best_only=True,
+                                                    initial_value_threshold=best)
+    callbacks = [
+        tf.keras.callbacks.BackupAndRestore(backup_dir=BACKUP_DIR),
+        checkpoint,
+        BestValueRecorder(checkpoint, run_info),
+        tf.keras.callbacks.EarlyStopping(monitor=monitor, patience=EARLY_STOPPING_PATIENCE, restore_best_weights=True),
+    ]
+    if on_progress is not None:
+        callbacks.append(ProgressCallback(on_progress, epoch_images, batch_size))
+    history = model.fit(train_dataset, validation_data=validation_dataset, epochs=epochs,
+                        steps_per_epoch=steps_per_epoch, callbacks=callbacks)
+    # The best checkpoint also covers runs that were resumed, where early stopping has no best weights in memory;
+    # its threshold carried over in run.json means it is never replaced by a worse epoch after resuming
+    if os.path.exists(BEST_CHECKPOINT_PATH):
+        model.load_weights(BEST_CHECKPOINT_PATH)
+
+    for epoch in range(len(history.history['loss'])):
+        line = f"Epoch {epoch+1}: Loss = {history.history['loss'][epoch]:.4f}, Accuracy = {history.history['accuracy'][epoch]*100:.2f}%"
+        if 'val_loss' in history.history:
+            line += f", Val Loss = {history.history['val_loss'][epoch]:.4f}, Val Accuracy = {history.history['val_accuracy'][epoch]*100:.2f}%"
+        print(line)
+
+    save_artifacts(model, class_labels, paths, out_dir)
+    shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+    return {'num_images': num_images, 'model': model, 'class_labels': class_labels}
+
+
+def save_artifacts(model, class_labels, paths, out_dir='.'):
+    os.makedirs(out_dir, exist_ok=True)
+    model.save(os.path.join(out_dir, MODEL_PATH))
+    with open(os.path.join(out_dir, LABELS_PATH), 'wb') as f:
+        pickle.dump(class_labels, f)
+    # Remember exactly which files the model has seen so update_model can find new ones
+    trained_files = {os.path.abspath(path): file_signature(path) for path in paths}
+    with open(os.path.join(out_dir, TRAINED_FILES_PATH), 'w') as f:
+        json.dump(trained_files, f)
+
+
+def load_trained_model(model_dir='.'):
+    model = tf.keras.models.load_model(os.path.join(model_dir, MODEL_PATH))
+    with open(os.path.join(model_dir, LABELS_PATH), 'rb') as f:
+        class_labels = pickle.load(f)
+    return model, class_labels
+
+
+def load_trained_files():
+    try:
+        with open(TRAINED_FILES_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_saved_labels():
+    if not os.path.exists(LABELS_PATH):
+        return None
+    with open(LABELS_PATH, 'rb') as f:
+        return pickle.load(f)
+
+
+def update_model(folder_path, on_progress=None):
+    # Fine-tune the saved model on new images plus a replay sample of old ones.
+    # Falls back to a full train_model run when the class set changed or nothing usable is saved.
+    paths, labels, class_labels = collect_images(folder_path)
+    trained_files = load_trained_files()
+    saved_labels = load_saved_labels()
+    if not paths or trained_files is None or not os.path.exists(MODEL_PATH) or saved_labels != class_labels:
+        print("Class set changed or no saved model; running full training.")
+        result = train_model(folder_path, on_progress)
+        result['mode'] = 'full'
+        return result
+
+    new_indices, old_indices = [], []
+    for index, path in enumerate(paths):
+        if trained_files.get(os.path.abspath(path)) == file_signature(path):
+            old_indices.append(index)
+        else:
+            new_indices.append(index)
+
+    model = tf.keras.models.load_model(MODEL_PATH)
+    if not new_indices:
+        return {'num_images': len(paths), 'new_images': 0, 'model': model, 'class_labels': class_labels, 'mode': 'update'}
+
+    replay_count = min(len(old_indices), max(REPLAY_MIN, REPLAY_RATIO * len(new_indices)))
+    indices = new_indices + random.sample(old_indices, replay_count)
+    print(f"Updating model with {len(new_indices)} new images and {replay_count} replayed images")
+
+    images, cached_labels, _, _ = DatasetCache().sync(folder_path, paths, labels, class_labels)
+    train_dataset = make_array_dataset(images, cached_labels, len(class_labels), indices=indices)
+
+    # A small learning rate keeps what the model already knows
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=UPDATE_LEARNING_RATE),
+                  loss='categorical_crossentropy', metrics=['accuracy'])
+    callbacks = []
+    if on_progress is not None:
+        callbacks.append(ProgressCallback(on_progress, len(indices), BATCH_SIZE))
+    model.fit(train_dataset, epochs=UPDATE_EPOCHS, callbacks=callbacks)
+
+    save_artifacts(model, class_labels, paths)
+    return {'num_images': len(paths), 'new_images': len(new_indices), 'model': model, 'class_labels': class_labels, 'mode': 'update'}
+
+
+def train_head(folder_path, on_progress=None):
+    # Keep the saved convolutional trunk frozen and retrain only the dense head on cached trunk features
+    paths, labels, class_labels = collect_images(folder_path)
+    if not paths or not os.path.exists(MODEL_PATH):
+        print("No saved model to reuse; running full training.")
+        result = train_model(folder_path, on_progress)
+        result['mode'] = 'full'
+        return result
+
+    saved_model = tf.keras.models.load_model(MODEL_PATH)
+    trunk, head_layers = split_model(saved_model)
+    images, cached_labels, _, _ = DatasetCache().sync(folder_path, paths, labels, class_labels)
+    features = EmbeddingCache(trunk).features([os.path.abspath(path) for path in paths], images)
+
+    head = tf.keras.Sequential([
+        tf.keras.layers.Dense(128, activation='relu', input_shape=(features.shape[1],)),
+        tf.keras.layers.Dense(len(class_labels), activation='softmax')
+    ])
+    # Warm-start from the saved head when its output still matches the class set
+    if load_saved_labels() == class_labels:
+        head.set_weights([w for layer in head_layers for w in layer.get_weights()])
+    head.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+
+    callbacks = []
+    if on_progress is not None:
+        callbacks.append(ProgressCallback(on_progress, len(paths), BATCH_SIZE))
+    head.fit(make_feature_dataset(features, cached_labels, len(class_labels)), epochs=HEAD_EPOCHS, callbacks=callbacks)
+
+    # Graft the retrained head back onto the saved trunk
+    model = build_model(len(class_labels))
+    model.set_weights(trunk.get_weights() + head.get_weights())
+    save_artifacts(model, class_labels, paths)
+    return {'num_images': len(paths), 'model': model, 'class_labels': class_labels, 'mode': 'head'}
+
+
+# Entry points selectable from the GUI and other front ends
+TRAINING_MODES = {
+    'full': train_model,
+    'update': update_model,
+    'head': train_head,
+}
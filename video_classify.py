@@ -0,0 +1,122 @@
+import json
+
+import numpy as np
+
+from datasets import IMG_SIZE
+
+# OpenCV is only needed for video, so the rest of the app works without it
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+SAMPLE_RATE = 1.0  # Frames classified per second of video
+VIDEO_BATCH_SIZE = 32
+SCENE_THUMBNAIL = (32, 32)
+
+
+def require_cv2():
+    if cv2 is None:
+        raise ImportError("Video classification needs OpenCV: pip install opencv-python-headless")
+
+
+def iter_frames(video_path, sample_rate=SAMPLE_RATE, scene_threshold=None):
+    # Yields (seconds, (150, 150, 3) uint8 RGB frame) one at a time, so memory stays flat for any length.
+    # Frames between samples are only grabbed, never converted. With scene_threshold set, a sampled
+    # frame is kept only if it differs from the last kept one by that mean absolute change (0-1).
+    require_cv2()
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {video_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    step = max(1, int(round(fps / sample_rate)))
+    last_thumbnail = None
+    index = 0
+    try:
+        while capture.grab():
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                if scene_threshold is not None:
+                    thumbnail = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), SCENE_THUMBNAIL,
+                                           interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+                    changed = last_thumbnail is None or np.abs(thumbnail - last_thumbnail).mean() >= scene_threshold
+                    if not changed:
+                        index += 1
+                        continue
+                    last_thumbnail = thumbnail
+                # Same nearest-neighbour downscale predictImage gets from load_img
+                frame = cv2.resize(frame, (IMG_SIZE[1], IMG_SIZE[0]), interpolation=cv2.INTER_NEAREST)
+                yield index / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+    finally:
+        capture.release()
+
+
+def video_duration(video_path):
+    require_cv2()
+    capture = cv2.VideoCapture(video_path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        return capture.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+    finally:
+        capture.release()
+
+
+def build_timeline(samples, class_labels, duration):
+    # Merges consecutive samples with the same top label into segments; each segment runs until the
+    # next segment's first sample, and its confidence is the mean probability of its label
+    timeline = []
+    for seconds, probabilities in samples:
+        index = int(np.argmax(probabilities))
+        if timeline and timeline[-1]['label'] == class_labels[index]:
+            segment = timeline[-1]
+            segment['confidences'].append(float(probabilities[index]))
+            continue
+        if timeline:
+            timeline[-1]['end'] = seconds
+        timeline.append({'start': seconds, 'end': None, 'label': class_labels[index],
+                         'confidences': [float(probabilities[index])]})
+    for segment in timeline:
+        confidences = segment.pop('confidences')
+        segment['frames'] = len(confidences)
+        segment['confidence'] = float(np.mean(confidences))
+    if timeline:
+        timeline[-1]['end'] = max(duration, timeline[-1]['start'])
+    return timeline
+
+
+def classify_video(video_path, predictor, class_labels, sample_rate=SAMPLE_RATE, scene_threshold=None,
+                   batch_size=VIDEO_BATCH_SIZE, on_progress=None):
+    # Returns the timeline of labelled segments; on_progress(seconds processed, duration) after each batch
+    duration = video_duration(video_path)
+    samples = []
+    times, frames = [], []
+
+    def flush():
+        predictions = predictor.predict(np.stack(frames).astype(np.float32) / 255.0)
+        samples.extend(zip(times, np.asarray(predictions)))
+        if on_progress is not None:
+            on_progress(times[-1], duration)
+        times.clear()
+        frames.clear()
+
+    for seconds, frame in iter_frames(video_path, sample_rate, scene_threshold):
+        times.append(seconds)
+        frames.append(frame)
+        if len(frames) == batch_size:
+            flush()
+    if frames:
+        flush()
+    return build_timeline(samples, class_labels, duration)
+
+
+def format_time(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes):02d}:{seconds:05.2f}"
+
+
+def save_timeline(timeline, output_path):
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(timeline, f, indent=2, ensure_ascii=False)
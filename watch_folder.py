@@ -0,0 +1,168 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from batch_classify import CLASSIFY_BATCH_SIZE, ResultWriter, iter_images, load_for_prediction, predict_loaded
+from datasets import IMAGE_EXTENSIONS
+
+# Watch-folder mode: classify photos as camera traps and sync tools drop them into a directory
+DEBOUNCE_SECONDS = 2.0  # A file must be quiet this long before it is classified
+POLL_INTERVAL = 1.0  # Seconds between checks; also how often the stop flag is seen
+WATCH_LOG_PATH = 'watch_log.csv'
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    # Linux kernel notifications through libc; no polling and no third-party package
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, folder_path):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.dirs = {}  # watch descriptor -> directory
+        try:
+            for folder, _, _ in os.walk(os.path.abspath(folder_path)):
+                self.add(folder)
+        except OSError:
+            self.close()
+            raise
+
+    def add(self, folder):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), self.MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), folder)
+        self.dirs[wd] = folder
+
+    def poll(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0'))
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                print("Watch folder: too many events at once, some files may have been missed")
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+            if wd not in self.dirs or not name:
+                continue
+            path = os.path.join(self.dirs[wd], name)
+            if mask & IN_ISDIR:
+                # A new sub-folder: watch it, and pick up anything copied in before the watch existed
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    for folder, _, _ in os.walk(path):
+                        self.add(folder)
+                    paths.extend(iter_images(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    # Fallback for other platforms: compares size and mtime of every image between scans
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.seen = self.snapshot()
+
+    def snapshot(self):
+        seen = {}
+        for path in iter_images(self.folder_path):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Removed between listing and stat
+            seen[os.path.abspath(path)] = (stat.st_size, stat.st_mtime_ns)
+        return seen
+
+    def poll(self, timeout):
+        time.sleep(timeout)
+        current = self.snapshot()
+        # A file still being written shows up on every scan, which keeps pushing back its debounce
+        changed = [path for path, signature in current.items() if self.seen.get(path) != signature]
+        self.seen = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(folder_path, polling=False):
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(folder_path)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); polling {folder_path} instead")
+    return PollingWatcher(folder_path)
+
+
+def watch_folder(folder_path, predictor, class_labels, log_path=WATCH_LOG_PATH, on_results=None, stop=None,
+                 debounce=DEBOUNCE_SECONDS, batch_size=CLASSIFY_BATCH_SIZE, polling=False):
+    # Runs until stop is set. Arrivals are held until they have been quiet for `debounce` seconds, then
+    # classified together, so a burst from a sync tool costs a few batched predict calls, not hundreds.
+    stop = stop or threading.Event()
+    writer = ResultWriter(log_path, class_labels)
+    watcher = make_watcher(folder_path, polling)
+    # Catch up on images that landed while nothing was watching
+    pending = {os.path.abspath(path): 0.0 for path in iter_images(folder_path)
+               if os.path.abspath(path) not in writer.done}
+    total = 0
+    try:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            while not stop.is_set():
+                for path in watcher.poll(POLL_INTERVAL):
+                    pending[os.path.abspath(path)] = time.monotonic()
+                now = time.monotonic()
+                ready = sorted(path for path, last_event in pending.items() if now - last_event >= debounce)
+                for start in range(0, len(ready), batch_size):
+                    batch = ready[start:start + batch_size]
+                    for path in batch:
+                        del pending[path]
+                    loaded = list(pool.map(load_for_prediction, batch))
+                    probabilities = predict_loaded(loaded, predictor)
+                    results = []
+                    for i, path in enumerate(batch):
+                        writer.write(path, probabilities.get(i), loaded[i][1])
+                        result = {'path': path, 'label': None, 'confidence': None, 'error': loaded[i][1]}
+                        if i in probabilities:
+                            index = int(np.argmax(probabilities[i]))
+                            result.update(label=class_labels[index], confidence=float(probabilities[i][index]))
+                        results.append(result)
+                    writer.flush()
+                    total += len(batch)
+                    if on_results is not None:
+                        on_results(results)
+    finally:
+        watcher.close()
+        writer.close()
+    return total